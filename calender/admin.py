@@ -1,6 +1,41 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import ClientCalendar,ClientCalendarDate
+from . import counters
+from . import realtime
 
 # Register your models here.
-admin.site.register(ClientCalendarDate)
+@admin.register(ClientCalendarDate)
+class ClientCalendarDateAdmin(admin.ModelAdmin):
+    readonly_fields = ('version',)
 
+    # Keep the calendar's completeness counters in step with admin edits
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if change:
+                stored = ClientCalendarDate.objects.select_for_update().get(pk=obj.pk)
+            else:
+                # Creates take the calendar lock like the API's, which the bulk create depends on
+                ClientCalendar.objects.select_for_update().get(pk=obj.calendar_id)
+            super().save_model(request, obj, form, change)
+            if change:
+                counters.record_updated(obj, counters.date_flags(stored))
+                patch = realtime.updated(obj, realtime.snapshot(stored))
+            else:
+                counters.record_created(obj)
+                patch = realtime.created(obj)
+            realtime.publish(obj.calendar_id, [patch])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            stored = ClientCalendarDate.objects.select_for_update().get(pk=obj.pk)
+            counters.record_deleted(stored)
+            realtime.publish(stored.calendar_id, [realtime.deleted(stored)])
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        calendars = ClientCalendar.objects.filter(dates__in=queryset).distinct()
+        calendar_ids = list(calendars.values_list('id', flat=True))
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            counters.recompute(ClientCalendar.objects.filter(id__in=calendar_ids))
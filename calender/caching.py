@@ -0,0 +1,53 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Month payloads are cached under a per-calendar version number that
+# pro_app.signals (and the bulk write paths) bump after every committed
+# write, so a cached payload is never served once its calendar changed.
+CALENDAR_CACHE_TIMEOUT = 60 * 10
+
+
+def _version_key(calendar_id):
+    return f"calendar_version:{calendar_id}"
+
+
+def _fresh_version():
+    # Starting from the clock means an evicted counter can't reissue an old version
+    return int(time.time() * 1000)
+
+
+def get_calendar_version(calendar_id):
+    key = _version_key(calendar_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(calendar_id):
+    try:
+        cache.incr(_version_key(calendar_id))
+    except ValueError:
+        cache.add(_version_key(calendar_id), _fresh_version(), None)
+
+
+def bump_calendar_version(calendar_id):
+    """Invalidate the calendar's cached payloads once the current transaction commits."""
+    transaction.on_commit(lambda: _bump(calendar_id))
+
+
+def calendar_etag(calendar_id, kind, version):
+    return f'"calendar-{calendar_id}-{kind}-{version}"'
+
+
+def month_payload(calendar_id, kind, version, build):
+    """Return the cached `kind` payload for this calendar version, building and storing it on a miss."""
+    key = f"calendar_payload:{calendar_id}:{kind}:{version}"
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, CALENDAR_CACHE_TIMEOUT)
+    return payload
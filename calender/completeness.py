@@ -0,0 +1,104 @@
+from django.db.models import Count, Q
+from django.db.models.functions import Trim
+
+from .models import ClientCalendarDate
+
+# Fields a content writer must fill in for every date
+CONTENT_FIELDS = ('tagline', 'caption', 'hashtags', 'e_hooks', 'creatives_text')
+APPROVAL_SOURCES = ('internal_status', 'client_approval')
+
+
+def _calendar_id(calendar):
+    return getattr(calendar, 'pk', calendar)
+
+
+def _failing(calendar, condition, **annotations):
+    dates = ClientCalendarDate.objects.filter(calendar_id=_calendar_id(calendar))
+    if annotations:
+        dates = dates.annotate(**annotations)
+    return dates.filter(condition)
+
+
+def _missing_dates(calendar, condition, **annotations):
+    # Only the dates of failing rows leave the database
+    return list(_failing(calendar, condition, **annotations).order_by('date').values_list('date', flat=True))
+
+
+def _blank(field):
+    return Q(**{f"{field}__isnull": True}) | Q(**{field: ''})
+
+
+def missing_resource_dates(calendar):
+    """Dates whose strategy resource is NULL, empty or only whitespace."""
+    return _missing_dates(
+        calendar,
+        Q(resource__isnull=True) | Q(trimmed_resource=''),
+        trimmed_resource=Trim('resource'),
+    )
+
+
+def _content_missing(fields):
+    condition = Q()
+    for field in fields:
+        condition |= _blank(field)
+    return condition
+
+
+def missing_content_dates(calendar, fields=CONTENT_FIELDS):
+    """Dates where any of the content fields is NULL or empty."""
+    return _missing_dates(calendar, _content_missing(fields))
+
+
+def missing_creatives_dates(calendar):
+    """Dates with no creatives: NULL, an empty list or anything without a first element."""
+    return _missing_dates(calendar, Q(creatives__isnull=True) | Q(creatives__0__isnull=True))
+
+
+def _unapproved(approval_field, source):
+    if source not in APPROVAL_SOURCES:
+        raise ValueError(f"Unknown approval source '{source}'.")
+    key = f"{source}__{approval_field}"
+    return (
+        ~Q(**{f"{source}__has_key": approval_field})
+        | Q(**{key: None})
+        | Q(**{f"{key}__in": [False, '']})
+        # Kept out of the list above: False == 0, so __in would drop one of them
+        | Q(**{key: 0})
+    )
+
+
+def unapproved_dates(calendar, approval_field, source='internal_status'):
+    """Dates whose `source` JSON lacks a truthy `approval_field` key."""
+    return _missing_dates(calendar, _unapproved(approval_field, source))
+
+
+def all_approved(calendar, approval_field, source='internal_status'):
+    return not _failing(calendar, _unapproved(approval_field, source)).exists()
+
+
+def counter_conditions():
+    """
+    {counter field: Q matching the dates it counts} for the ClientCalendar
+    counters. Needs the trimmed_resource annotation from counter_annotations().
+    """
+    return {
+        'dates_missing_resource': Q(resource__isnull=True) | Q(trimmed_resource=''),
+        'dates_missing_content': _content_missing(CONTENT_FIELDS),
+        'dates_missing_creatives': Q(creatives__isnull=True) | Q(creatives__0__isnull=True),
+        'pending_internal_content': _unapproved('content_approval', 'internal_status'),
+        'pending_internal_creatives': _unapproved('creatives_approval', 'internal_status'),
+        'pending_client_content': _unapproved('content_approval', 'client_approval'),
+        'pending_client_creatives': _unapproved('creatives_approval', 'client_approval'),
+    }
+
+
+def counter_annotations():
+    return {'trimmed_resource': Trim('resource')}
+
+
+def counter_aggregates():
+    """Aggregate expressions computing every counter in one pass over the dates."""
+    aggregates = {'dates_total': Count('id')}
+    for field, condition in counter_conditions().items():
+        aggregates[field] = Count('id', filter=condition)
+    return aggregates
@@ -0,0 +1,115 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from . import completeness
+from .models import ClientCalendar, ClientCalendarDate
+
+# Python mirror of the SQL conditions in completeness.counter_conditions(),
+# used to work out the delta a single date write makes to its calendar.
+
+
+def _blank(value):
+    return value is None or value == ''
+
+
+def _unapproved(status, approval_field):
+    if not isinstance(status, dict) or approval_field not in status:
+        return True
+    value = status[approval_field]
+    return value is None or value in (False, '', 0)
+
+
+def date_flags(date):
+    """{counter field: 0 or 1} for one ClientCalendarDate."""
+    creatives = date.creatives
+    flags = {
+        'dates_total': True,
+        # SQL TRIM only strips spaces
+        'dates_missing_resource': date.resource is None or date.resource.strip(' ') == '',
+        'dates_missing_content': any(_blank(getattr(date, field)) for field in completeness.CONTENT_FIELDS),
+        'dates_missing_creatives': not (isinstance(creatives, list) and creatives),
+        'pending_internal_content': _unapproved(date.internal_status, 'content_approval'),
+        'pending_internal_creatives': _unapproved(date.internal_status, 'creatives_approval'),
+        'pending_client_content': _unapproved(date.client_approval, 'content_approval'),
+        'pending_client_creatives': _unapproved(date.client_approval, 'creatives_approval'),
+    }
+    return {field: int(flag) for field, flag in flags.items()}
+
+
+def _apply(calendar_id, deltas):
+    changes = {
+        field: Greatest(F(field) + delta, 0) if delta < 0 else F(field) + delta
+        for field, delta in deltas.items() if delta
+    }
+    if changes:
+        ClientCalendar.objects.filter(pk=calendar_id).update(**changes)
+
+
+def record_created(date):
+    _apply(date.calendar_id, date_flags(date))
+
+
+def record_updated(date, old_flags):
+    """Apply the difference between the date's flags before (old_flags) and after a save."""
+    new_flags = date_flags(date)
+    _apply(date.calendar_id, {field: new_flags[field] - old_flags[field] for field in new_flags})
+
+
+def record_deleted(date):
+    _apply(date.calendar_id, {field: -flag for field, flag in date_flags(date).items()})
+
+
+def _total(flag_rows):
+    totals = dict.fromkeys(ClientCalendar.COUNTER_FIELDS, 0)
+    for flags in flag_rows:
+        for field, flag in flags.items():
+            totals[field] += flag
+    return totals
+
+
+def record_bulk_created(calendar_id, dates):
+    _apply(calendar_id, _total(date_flags(date) for date in dates))
+
+
+def record_bulk_updated(calendar_id, old_flags, dates):
+    """Net change for dates of one calendar; old_flags lines up with dates."""
+    before = _total(old_flags)
+    after = _total(date_flags(date) for date in dates)
+    _apply(calendar_id, {field: after[field] - before[field] for field in after})
+
+
+def compute(calendars=None):
+    """Return {calendar_id: {counter field: value}} counted from the dates table in one query."""
+    dates = ClientCalendarDate.objects.all()
+    if calendars is not None:
+        dates = dates.filter(calendar__in=calendars)
+    rows = (
+        dates.annotate(**completeness.counter_annotations())
+        .values('calendar_id')
+        .order_by()
+        .annotate(**completeness.counter_aggregates())
+    )
+    return {row.pop('calendar_id'): row for row in rows}
+
+
+def recompute(calendars=None, fix=True):
+    """
+    Compare the stored counters with a fresh count and, with fix, overwrite
+    the ones that drifted. Returns {calendar_id: {field: (stored, actual)}}.
+    """
+    queryset = ClientCalendar.objects.all() if calendars is None else calendars
+    stored = queryset.values('id', *ClientCalendar.COUNTER_FIELDS)
+    actual = compute(queryset)
+    empty = dict.fromkeys(ClientCalendar.COUNTER_FIELDS, 0)
+
+    drift = {}
+    for row in stored:
+        calendar_id = row.pop('id')
+        counted = actual.get(calendar_id, empty)
+        diff = {field: (row[field], counted[field]) for field in row if row[field] != counted[field]}
+        if not diff:
+            continue
+        drift[calendar_id] = diff
+        if fix:
+            ClientCalendar.objects.filter(pk=calendar_id).update(**counted)
+    return drift
@@ -0,0 +1,165 @@
+import calendar as month_calendar
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+
+from client.models import Clients, ClientsPlan
+from . import counters
+from .models import ClientCalendar, ClientCalendarDate
+from .periods import add_months
+
+# 'clone' copies last month's type/category/cta layout, 'plan' spreads the
+# counts in the client's plan attributes over the month, 'auto' clones when
+# there is a previous month to clone and otherwise uses the plan.
+MODES = ('auto', 'clone', 'plan')
+CLONED_FIELDS = ('post_count', 'type', 'category', 'cta')
+# Plan attribute keys that are counts of content to schedule; any other
+# numeric attribute (revisions, ad spend, ...) is not turned into dates
+CONTENT_TYPES = ('post', 'reel', 'story', 'carousel', 'video')
+
+
+class CalendarGenerationError(Exception):
+    pass
+
+
+def _days_in(period):
+    return month_calendar.monthrange(period.year, period.month)[1]
+
+
+def plan_counts(attributes):
+    """{content type: count} for the CONTENT_TYPES plan attributes holding a positive number, e.g. {'post': 12, 'reel': 4}."""
+    counts = {}
+    for key, value in (attributes or {}).items():
+        content_type = str(key).strip().lower()
+        if content_type not in CONTENT_TYPES:
+            continue
+        try:
+            count = int(value)
+        except (TypeError, ValueError):
+            continue
+        if count > 0:
+            counts[content_type] = counts.get(content_type, 0) + count
+    return counts
+
+
+def spread_days(count, period):
+    # Evenly spaced days across the month, starting part way into the first gap
+    days = _days_in(period)
+    return [period.replace(day=int((i + 0.5) * days / count) + 1) for i in range(count)]
+
+
+def day_counts(count, period):
+    """
+    {day: posts} spreading count over the month: one post on evenly spaced
+    days, or when count exceeds the month's days, several posts a day with
+    the remainder spread evenly on top.
+    """
+    per_day, extra = divmod(count, _days_in(period))
+    counts = {period.replace(day=day): per_day for day in range(1, _days_in(period) + 1)} if per_day else {}
+    for day in spread_days(extra, period):
+        counts[day] = counts.get(day, 0) + 1
+    return counts
+
+
+def cloned_dates(previous_dates, period):
+    """Unsaved dates for period copying the layout of the previous month's dates, day for day."""
+    last_day = _days_in(period)
+    return [
+        ClientCalendarDate(
+            date=period.replace(day=min(old.date.day, last_day)),
+            **{field: getattr(old, field) for field in CLONED_FIELDS}
+        )
+        for old in sorted(previous_dates, key=lambda d: (d.date, d.id))
+    ]
+
+
+def planned_dates(attributes, period):
+    """Unsaved dates for period with one row per content type and day, each type's count spread over the month."""
+    dates = [
+        ClientCalendarDate(date=day, post_count=posts, type=content_type)
+        for content_type, count in plan_counts(attributes).items()
+        for day, posts in day_counts(count, period).items()
+    ]
+    return sorted(dates, key=lambda d: d.date)
+
+
+def _build_dates(mode, period, previous_dates, plan):
+    if mode in ('auto', 'clone') and previous_dates:
+        return cloned_dates(previous_dates, period)
+    if mode == 'clone':
+        raise CalendarGenerationError("No dates in the previous month's calendar to clone.")
+    dates = planned_dates(plan.attributes if plan else {}, period)
+    if not dates:
+        raise CalendarGenerationError(
+            f"The client's plan has no counts to schedule; expected one of: {', '.join(CONTENT_TYPES)}."
+        )
+    return dates
+
+
+def _save(client, period, dates):
+    with transaction.atomic():
+        calendar = ClientCalendar.objects.create(client=client, month_name=f"{period:%B %Y}")
+        for calendar_date in dates:
+            calendar_date.calendar = calendar
+        ClientCalendarDate.objects.bulk_create(dates)
+        counters.record_bulk_created(calendar.id, dates)
+    return calendar
+
+
+def _latest_plans(client_ids):
+    plans = {}
+    for plan in ClientsPlan.objects.filter(client_id__in=client_ids).order_by('client_id', '-updated_at'):
+        plans.setdefault(plan.client_id, plan)
+    return plans
+
+
+def generate_calendar(client, period, mode='auto'):
+    """Create the client's calendar for period (a first-of-month date) with all its dates in one insert."""
+    if mode not in MODES:
+        raise CalendarGenerationError(f"Unknown mode '{mode}'.")
+    if ClientCalendar.objects.filter(client=client, period=period).exists():
+        raise CalendarGenerationError(f"{client.business_name} already has a calendar for {period:%B %Y}.")
+
+    previous_dates = list(ClientCalendarDate.objects.filter(
+        calendar__client=client, calendar__period=add_months(period, -1)
+    ))
+    dates = _build_dates(mode, period, previous_dates, _latest_plans([client.id]).get(client.id))
+    try:
+        calendar = _save(client, period, dates)
+    except IntegrityError:
+        raise CalendarGenerationError(f"{client.business_name} already has a calendar for {period:%B %Y}.")
+    calendar.refresh_from_db(fields=ClientCalendar.COUNTER_FIELDS)
+    return calendar
+
+
+def rollover(period, mode='auto', clients=None, dry_run=False):
+    """
+    Generate period's calendar for every client that has last month's
+    calendar or a plan and no calendar for period yet. Inputs are loaded
+    with a handful of queries for all clients; each calendar is saved in its
+    own transaction. Returns {'created': [...], 'skipped': {client_id: reason}}.
+    """
+    if mode not in MODES:
+        raise CalendarGenerationError(f"Unknown mode '{mode}'.")
+    previous = add_months(period, -1)
+    clients = Clients.objects.all() if clients is None else clients
+
+    previous_dates = defaultdict(list)
+    for calendar_date in ClientCalendarDate.objects.filter(
+        calendar__client__in=clients, calendar__period=previous
+    ).select_related('calendar'):
+        previous_dates[calendar_date.calendar.client_id].append(calendar_date)
+    plans = _latest_plans(clients.values('id'))
+    existing = set(ClientCalendar.objects.filter(client__in=clients, period=period).values_list('client_id', flat=True))
+
+    created, skipped = [], {}
+    candidates = clients.filter(id__in={*previous_dates, *plans}).exclude(id__in=existing).order_by('id')
+    for client in candidates:
+        try:
+            dates = _build_dates(mode, period, previous_dates.get(client.id), plans.get(client.id))
+            if not dry_run:
+                _save(client, period, dates)
+            created.append((client, len(dates)))
+        except (CalendarGenerationError, IntegrityError) as e:
+            skipped[client.id] = str(e) or "Calendar already exists."
+    return {'created': created, 'skipped': skipped}
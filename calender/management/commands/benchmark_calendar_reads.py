@@ -0,0 +1,67 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+
+from calender import serializers
+from calender.models import ClientCalendar, ClientCalendarDate
+
+
+class Command(BaseCommand):
+    help = "Time the calendar read paths (ModelSerializer vs the lean row builders) against real data. Read-only."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calendar', type=int, help="Calendar to read (default: the one with the most dates).")
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def _measure(self, label, build, rows, repeat):
+        with CaptureQueriesContext(connection) as queries:
+            result = build()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            build()
+        elapsed = (time.perf_counter() - started) / repeat
+        per_row = elapsed / rows * 1e6 if rows else 0
+        self.stdout.write(f"  {label:<42} {elapsed * 1000:8.2f} ms  {per_row:8.1f} us/row  {len(queries):4d} queries")
+        return json.loads(json.dumps(result, default=str))
+
+    def handle(self, *args, **options):
+        calendars = ClientCalendar.objects.all()
+        if options['calendar']:
+            calendar = calendars.filter(id=options['calendar']).first()
+        else:
+            calendar = calendars.annotate(n=Count('dates')).order_by('-n').first()
+        if calendar is None:
+            raise CommandError("No calendar to benchmark.")
+
+        repeat = options['repeat']
+        dates = ClientCalendarDate.objects.filter(calendar=calendar)
+        count = dates.count()
+        self.stdout.write(f"Calendar {calendar.id} ({calendar}): {count} dates, {repeat} runs each")
+
+        self.stdout.write("Date list:")
+        before = self._measure("ClientCalendarDateSerializer", lambda: serializers.ClientCalendarDateSerializer(dates.all(), many=True).data, count, repeat)
+        after = self._measure("calendar_date_rows", lambda: serializers.calendar_date_rows(dates.all()), count, repeat)
+        self._check(before, after)
+
+        self.stdout.write("Month view:")
+        before = self._measure("FilteredClientCalendarDateSerializer", lambda: serializers.FilteredClientCalendarDateSerializer(dates.all(), many=True).data, count, repeat)
+        after = self._measure("filtered_calendar_date_rows", lambda: serializers.filtered_calendar_date_rows(dates.all()), count, repeat)
+        self._check(before, after)
+
+        client_calendars = ClientCalendar.objects.filter(client_id=calendar.client_id)
+        total = client_calendars.count()
+        self.stdout.write(f"Client calendar list ({total} calendars):")
+        self._measure("without select_related", lambda: serializers.ClientCalendarSerializer(client_calendars.all(), many=True).data, total, repeat)
+        self._measure("select_related('client__account_manager')", lambda: serializers.ClientCalendarSerializer(
+            client_calendars.select_related('client__account_manager'), many=True
+        ).data, total, repeat)
+
+    def _check(self, before, after):
+        if before == after:
+            self.stdout.write(self.style.SUCCESS("  payloads match"))
+        else:
+            self.stdout.write(self.style.ERROR("  payloads differ"))
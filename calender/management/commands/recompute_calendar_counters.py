@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from calender import counters
+from calender.models import ClientCalendar
+
+
+class Command(BaseCommand):
+    help = "Recount the completeness counters on client calendars and repair any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('calendar_ids', nargs='*', type=int, help="Only these calendars (default: all).")
+        parser.add_argument('--verify', action='store_true', help="Report drift without writing anything.")
+
+    def handle(self, *args, **options):
+        calendars = ClientCalendar.objects.all()
+        if options['calendar_ids']:
+            calendars = calendars.filter(id__in=options['calendar_ids'])
+
+        fix = not options['verify']
+        drift = counters.recompute(calendars, fix=fix)
+        for calendar_id, fields in sorted(drift.items()):
+            details = ", ".join(f"{field} {stored} -> {actual}" for field, (stored, actual) in fields.items())
+            self.stdout.write(f"Calendar {calendar_id}: {details}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All calendar counters are up to date."))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f"Repaired counters on {len(drift)} calendar(s)."))
+        else:
+            raise CommandError(f"{len(drift)} calendar(s) have drifted counters.")
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from calender import generation, periods
+from client.models import Clients
+
+
+class Command(BaseCommand):
+    help = "Generate next month's calendar for every client that has this month's calendar or a plan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="Month to generate, e.g. 2025-07 (default: next month).")
+        parser.add_argument('--mode', choices=generation.MODES, default='auto')
+        parser.add_argument('--client', type=int, action='append', dest='client_ids', help="Only these client ids.")
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be generated without writing.")
+
+    def handle(self, *args, **options):
+        if options['month']:
+            period = periods.parse_month(options['month'])
+            if period is None:
+                raise CommandError(f"Unrecognised month '{options['month']}'.")
+        else:
+            period = periods.add_months(periods.parse_month(timezone.localdate()), 1)
+
+        clients = Clients.objects.all()
+        if options['client_ids']:
+            clients = clients.filter(id__in=options['client_ids'])
+
+        result = generation.rollover(period, mode=options['mode'], clients=clients, dry_run=options['dry_run'])
+        verb = "Would generate" if options['dry_run'] else "Generated"
+        for client, count in result['created']:
+            self.stdout.write(f"{verb} {period:%B %Y} for {client.business_name} ({count} dates)")
+        for client_id, reason in sorted(result['skipped'].items()):
+            self.stdout.write(self.style.WARNING(f"Skipped client {client_id}: {reason}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {len(result['created'])} calendar(s) for {period:%B %Y}, skipped {len(result['skipped'])}."
+        ))
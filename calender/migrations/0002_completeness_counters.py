@@ -0,0 +1,70 @@
+# Generated by Django 4.2.18 on 2026-10-17 17:50
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    # Count every calendar's dates once with the same SQL conditions the app maintains
+    from calender.completeness import counter_aggregates, counter_annotations
+
+    ClientCalendar = apps.get_model('calender', 'ClientCalendar')
+    ClientCalendarDate = apps.get_model('calender', 'ClientCalendarDate')
+    rows = (
+        ClientCalendarDate.objects.annotate(**counter_annotations())
+        .values('calendar_id')
+        .order_by()
+        .annotate(**counter_aggregates())
+    )
+    for row in rows:
+        ClientCalendar.objects.filter(pk=row.pop('calendar_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientcalendar',
+            name='dates_missing_content',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='clientcalendar',
+            name='dates_missing_creatives',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='clientcalendar',
+            name='dates_missing_resource',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='clientcalendar',
+            name='dates_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='clientcalendar',
+            name='pending_client_content',
+            field=models.PositiveIntegerField(default=0, help_text='Dates without client content approval.'),
+        ),
+        migrations.AddField(
+            model_name='clientcalendar',
+            name='pending_client_creatives',
+            field=models.PositiveIntegerField(default=0, help_text='Dates without client creatives approval.'),
+        ),
+        migrations.AddField(
+            model_name='clientcalendar',
+            name='pending_internal_content',
+            field=models.PositiveIntegerField(default=0, help_text='Dates without internal content approval.'),
+        ),
+        migrations.AddField(
+            model_name='clientcalendar',
+            name='pending_internal_creatives',
+            field=models.PositiveIntegerField(default=0, help_text='Dates without internal creatives approval.'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.18 on 2026-10-17 17:51
+
+from django.db import migrations, models
+
+
+def backfill_periods(apps, schema_editor):
+    from calender.periods import parse_month
+
+    ClientCalendar = apps.get_model('calender', 'ClientCalendar')
+    taken = set()
+    unparsed = []
+    for calendar in ClientCalendar.objects.order_by('created_at', 'id').iterator():
+        period = parse_month(calendar.month_name, reference=calendar.created_at)
+        if period is None or (calendar.client_id, period) in taken:
+            # Left NULL: unreadable names and later duplicates of a client's month
+            unparsed.append(f"{calendar.id} ({calendar.month_name!r})")
+            continue
+        taken.add((calendar.client_id, period))
+        ClientCalendar.objects.filter(pk=calendar.pk).update(period=period)
+    if unparsed:
+        print(f"\n  Calendars left without a period: {', '.join(unparsed)}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender', '0002_completeness_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientcalendar',
+            name='period',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_periods, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='clientcalendar',
+            constraint=models.UniqueConstraint(fields=('client', 'period'), name='unique_client_calendar_period'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-17 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender', '0003_calendar_period'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientcalendardate',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
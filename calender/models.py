@@ -3,6 +3,7 @@ from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 from django.core.exceptions import ValidationError
 from client.models import Clients
+from .periods import parse_month
 
 
 # Create your models here.
@@ -16,6 +17,8 @@ class ClientCalendar(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     #  change the datatype of month_name to charfireld
     month_name = models.CharField(max_length=20 , db_index=True)
+    # First day of the calendar's month, parsed from month_name; NULL when it can't be read
+    period = models.DateField(null=True, blank=True, editable=False)
     strategy_completed = models.BooleanField(default=False)
     content_completed = models.BooleanField(default=False)
     creatives_completed = models.BooleanField(default=False)
@@ -27,10 +30,43 @@ class ClientCalendar(models.Model):
     smo_completed = models.BooleanField(default=False, help_text="Indicates if the SMO task is completed for the month.")
     monthly_reports = models.FileField(upload_to='reports/', null=True, blank=True, validators=[FileExtensionValidator(allowed_extensions=['pdf'])])
 
-    
+    # Completeness counters over this calendar's dates, maintained by calender.counters
+    dates_total = models.PositiveIntegerField(default=0)
+    dates_missing_resource = models.PositiveIntegerField(default=0)
+    dates_missing_content = models.PositiveIntegerField(default=0)
+    dates_missing_creatives = models.PositiveIntegerField(default=0)
+    pending_internal_content = models.PositiveIntegerField(default=0, help_text="Dates without internal content approval.")
+    pending_internal_creatives = models.PositiveIntegerField(default=0, help_text="Dates without internal creatives approval.")
+    pending_client_content = models.PositiveIntegerField(default=0, help_text="Dates without client content approval.")
+    pending_client_creatives = models.PositiveIntegerField(default=0, help_text="Dates without client creatives approval.")
+
+    COUNTER_FIELDS = (
+        'dates_total', 'dates_missing_resource', 'dates_missing_content', 'dates_missing_creatives',
+        'pending_internal_content', 'pending_internal_creatives', 'pending_client_content', 'pending_client_creatives',
+    )
+
+    def save(self, *args, **kwargs):
+        self.period = parse_month(self.month_name, reference=self.created_at) or self.period
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'month_name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'period'}
+        # Counters only change through F() updates; a full save must not write back a stale copy
+        if not self._state.adding and update_fields is None and not args:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.client} - {self.month_name}"
 
+    class Meta:
+        constraints = [
+            # Also serves "last N months for this client" range scans
+            models.UniqueConstraint(fields=['client', 'period'], name='unique_client_calendar_period'),
+        ]
+
 class ClientCalendarDate(models.Model):
     calendar = models.ForeignKey(ClientCalendar, on_delete=models.CASCADE, related_name='dates')
     created_at = models.DateTimeField(default=timezone.now)
@@ -59,6 +95,15 @@ class ClientCalendarDate(models.Model):
 
     comments = models.TextField(blank=True, null=True)
     collaboration = models.TextField(blank=True, null=True)
+    # Bumped on every update so clients can spot conflicting edits
+    version = models.PositiveIntegerField(default=1)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
 
     # Validation for internal_status and client_approval fields
     def clean(self):
@@ -0,0 +1,82 @@
+import calendar as month_calendar
+import re
+from datetime import date
+
+from django.utils import timezone
+
+# ClientCalendar.period is the first day of the calendar's month. It is derived
+# from the free-form month_name ("January 2025", "2025-01", "Jan", ...).
+
+_MONTHS = {name.lower(): number for number, name in enumerate(month_calendar.month_name) if name}
+_MONTHS.update({name.lower(): number for number, name in enumerate(month_calendar.month_abbr) if name})
+_MONTHS['sept'] = 9
+_SEPARATORS = re.compile(r"[\s\-/.,_']+")
+
+
+def _months_between(a, b):
+    return (a.year - b.year) * 12 + a.month - b.month
+
+
+def _nearest(month, reference):
+    # A bare month name means the occurrence closest to the reference date
+    candidates = [date(year, month, 1) for year in (reference.year - 1, reference.year, reference.year + 1)]
+    return min(candidates, key=lambda d: (abs(_months_between(d, reference)), -d.year))
+
+
+def split_month(value):
+    """Read (year, month) from a month name; year is None when not given, both None if unreadable."""
+    tokens = [t for t in _SEPARATORS.split(str(value or '').strip().lower()) if t]
+    if not tokens:
+        return None, None
+
+    year_index = next((i for i, t in enumerate(tokens) if t.isdigit() and len(t) == 4), None)
+    month = next((_MONTHS[t] for t in tokens if t in _MONTHS), None)
+    if month is None:
+        numbers = [t for i, t in enumerate(tokens) if t.isdigit() and i != year_index]
+        if len(numbers) == 1 or (year_index == 0 and len(numbers) == 2):
+            month = int(numbers[0])
+    if not month or not 1 <= month <= 12:
+        return None, None
+    return (int(tokens[year_index]) if year_index is not None else None), month
+
+
+def parse_month(value, reference=None):
+    """
+    Return the first day of the month named by value, or None if it can't be
+    read. Without a year the month closest to reference (default today) wins.
+    """
+    if isinstance(value, date):
+        return date(value.year, value.month, 1)
+    year, month = split_month(value)
+    if month is None:
+        return None
+    if year is None:
+        return _nearest(month, reference or timezone.localdate())
+    return date(year, month, 1)
+
+
+def find_calendar(calendars, month_name, fallback_lookup='month_name'):
+    """
+    Pick the calendar for month_name out of a client's calendars through the
+    (client, period) index. A bare month name matches the latest such month;
+    names that can't be parsed fall back to fallback_lookup on month_name.
+    """
+    year, month = split_month(month_name)
+    if month is None:
+        calendars = calendars.filter(**{fallback_lookup: month_name})
+    elif year is None:
+        calendars = calendars.filter(period__month=month)
+    else:
+        calendars = calendars.filter(period=date(year, month, 1))
+    return calendars.order_by('-period', '-created_at').first()
+
+
+def add_months(period, months):
+    index = period.year * 12 + period.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(months, until=None):
+    """(first, last) periods covering the `months` months ending with until (default this month)."""
+    last = parse_month(until or timezone.localdate())
+    return add_months(last, -(months - 1)), last
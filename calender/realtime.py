@@ -0,0 +1,40 @@
+from django.db import transaction
+
+from notifications.dispatch import queue_group_send
+from .serializers import calendar_date_row
+
+# Field-level patches for CalendarConsumer. Each patch names one date, its
+# new version and only the fields that changed, in the same shape as the
+# date list payload, so clients can apply it to the grid they already have.
+
+
+def calendar_group_name(calendar_id):
+    return f"calendar_{calendar_id}"
+
+
+def snapshot(calendar_date):
+    """The date's row as clients see it; pass it to updated() after the save."""
+    return calendar_date_row(calendar_date)
+
+
+def created(calendar_date):
+    row = calendar_date_row(calendar_date)
+    return {"op": "create", "id": row['id'], "version": row['version'], "fields": row}
+
+
+def updated(calendar_date, before):
+    row = calendar_date_row(calendar_date)
+    fields = {key: value for key, value in row.items() if before.get(key) != value and key != 'version'}
+    return {"op": "update", "id": row['id'], "version": row['version'], "fields": fields}
+
+
+def deleted(calendar_date):
+    return {"op": "delete", "id": calendar_date.id, "version": calendar_date.version, "fields": {}}
+
+
+def publish(calendar_id, patches):
+    """Send the patches to the calendar's subscribers once the current transaction commits."""
+    if not patches:
+        return
+    event = {"type": "calendar_patch", "calendar_id": calendar_id, "patches": patches}
+    transaction.on_commit(lambda: queue_group_send(calendar_group_name(calendar_id), event))
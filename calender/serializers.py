@@ -1,13 +1,26 @@
 from rest_framework import serializers
 from django.conf import settings
 from .models import ClientCalendar, ClientCalendarDate
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 # Optimized code for serializers
 
+CREATED_AT_FORMAT = '%Y-%m-%d %H:%M'
+# Public URL prefix for stored creatives, built once instead of per creative
+CREATIVE_URL_PREFIX = f"{settings.SUPABASE_URL}/storage/v1/object/public/{settings.SUPABASE_BUCKET}/"
+
+
+def expand_creative_path(path):
+    # Convert a storage path to its full URL
+    if path.startswith(('http://', 'https://')):
+        return path
+    return CREATIVE_URL_PREFIX + path.lstrip('/')
+
+
 class BaseCalendarSerializer(serializers.ModelSerializer):
     # Base serializer with common fields and methods
-    created_at = serializers.DateTimeField(format='%Y-%m-%d %H:%M', read_only=True)
+    created_at = serializers.DateTimeField(format=CREATED_AT_FORMAT, read_only=True)
     
     class Meta:
         abstract = True
@@ -88,6 +101,7 @@ class ClientCalendarDateSerializer(BaseCalendarSerializer):
     class Meta:
         model = ClientCalendarDate
         fields = '__all__'
+        read_only_fields = ['version']
         extra_kwargs = {
             'internal_status': {'write_only': True},
             'client_approval': {'write_only': True}
@@ -132,12 +146,13 @@ class ClientCalendarDateSerializer(BaseCalendarSerializer):
 
     def _expand_creative_path(self, path):
         """Convert storage path to full URL"""
-        if path.startswith(('http://', 'https://')):
-            return path
-        return (
-            f"{settings.SUPABASE_URL}/storage/v1/object/public/"
-            f"{settings.SUPABASE_BUCKET}/{path.lstrip('/')}"
-        )
+        return expand_creative_path(path)
+
+class BulkClientCalendarDateSerializer(ClientCalendarDateSerializer):
+    """Bulk create items; the calendar comes from the URL, not from each item"""
+
+    class Meta(ClientCalendarDateSerializer.Meta):
+        read_only_fields = ['calendar', 'version']
 
 class FilteredClientCalendarDateSerializer(ClientCalendarDateSerializer):
     """Lightweight serializer for list views"""
@@ -159,6 +174,75 @@ class FilteredClientCalendarDateSerializer(ClientCalendarDateSerializer):
         return len(obj.creatives) if obj.creatives else 0
 
 
+# Read-only fast path for month views: plain dicts built from .values() rows,
+# matching the serializers above without per-row field introspection.
+_DATE_COLUMNS = (
+    'id', 'created_at', 'creatives', 'internal_status', 'client_approval', 'date', 'post_count',
+    'type', 'category', 'cta', 'resource', 'tagline', 'caption', 'hashtags', 'e_hooks',
+    'creatives_text', 'comments', 'collaboration', 'version', 'calendar_id',
+)
+_FILTERED_DATE_COLUMNS = ('id', 'date', 'post_count', 'type', 'category', 'creatives', 'internal_status', 'client_approval', 'comments')
+
+
+def _created_at(value):
+    return timezone.localtime(value).strftime(CREATED_AT_FORMAT) if value else None
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _date_row(row):
+    return {
+        'id': row['id'],
+        'created_at': _created_at(row['created_at']),
+        'creatives': [expand_creative_path(str(path)) for path in row['creatives'] or [] if path],
+        'approval_status': {'internal': row['internal_status'], 'client': row['client_approval']},
+        'date': _iso(row['date']),
+        'post_count': row['post_count'],
+        'type': row['type'],
+        'category': row['category'],
+        'cta': row['cta'],
+        'resource': row['resource'],
+        'tagline': row['tagline'],
+        'caption': row['caption'],
+        'hashtags': row['hashtags'],
+        'e_hooks': row['e_hooks'],
+        'creatives_text': row['creatives_text'],
+        'comments': row['comments'],
+        'collaboration': row['collaboration'],
+        'version': row['version'],
+        'calendar': row['calendar_id'],
+    }
+
+
+def calendar_date_rows(dates):
+    """Same output as ClientCalendarDateSerializer(dates, many=True).data."""
+    return [_date_row(row) for row in dates.values(*_DATE_COLUMNS)]
+
+
+def calendar_date_row(calendar_date):
+    """Same output as ClientCalendarDateSerializer(calendar_date).data, for an instance already in memory."""
+    return _date_row({column: getattr(calendar_date, column) for column in _DATE_COLUMNS})
+
+
+def filtered_calendar_date_rows(dates):
+    """Same output as FilteredClientCalendarDateSerializer(dates, many=True).data."""
+    return [
+        {
+            'id': row['id'],
+            'date': _iso(row['date']),
+            'post_count': row['post_count'],
+            'type': row['type'],
+            'category': row['category'],
+            'creative_count': len(row['creatives']) if row['creatives'] else 0,
+            'approval_status': {'internal': row['internal_status'], 'client': row['client_approval']},
+            'comments': row['comments'],
+        }
+        for row in dates.values(*_FILTERED_DATE_COLUMNS)
+    ]
+
+
 
 # Previous Code
 
@@ -183,14 +267,17 @@ class ClientCalendarSerializer(serializers.ModelSerializer):
             'client',
             'created_at',
             'month_name',
+            'period',
             'strategy_completed',
             'content_completed',
             'creatives_completed',
             'mm_content_completed',
             'acc_creative_completed',
             'mm_creative_completed',
-            'acc_content_completed'
+            'acc_content_completed',
+            *ClientCalendar.COUNTER_FIELDS,  # Completeness counters for progress displays
         ]
+        read_only_fields = ClientCalendar.COUNTER_FIELDS
     def get_account_manager_id(self, obj):
         # Retrieve the account manager ID from the related client
         return obj.client.account_manager.id if obj.client and obj.client.account_manager else None
@@ -1,3 +1,217 @@
+from datetime import date
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from account.models import CustomUser
+from client.models import Clients
+from team.models import Team, TeamMembership
+from . import caching, completeness, counters
+from .models import ClientCalendar, ClientCalendarDate
+from .views import MAX_BULK_DATES
+
+
+def make_user(role, n=''):
+    return CustomUser.objects.create(email=f'{role}{n}@example.com', username=f'{role}{n}', role=role)
+
+
+class CalendarTestMixin:
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('calender.realtime.queue_group_send')
+        self.queue_group_send = patcher.start()
+        self.addCleanup(patcher.stop)
+        director = make_user('marketing_director')
+        team = Team.objects.create(name='Team', created_by=director)
+        self.users = {'account_manager': make_user('account_manager')}
+        for role in ('marketing_manager', 'content_writer', 'graphics_designer'):
+            self.users[role] = make_user(role)
+            TeamMembership.objects.create(team=team, user=self.users[role])
+        client = Clients.objects.create(
+            team=team, account_manager=self.users['account_manager'], business_name='Client',
+            contact_person='Contact', business_address='Address', business_email_address='client@example.com',
+        )
+        self.calendar = ClientCalendar.objects.create(client=client, month_name='January 2026')
+        self.api = APIClient()
+        self.dates_url = f'/api/calendars/{self.calendar.id}/dates'
+        self.bulk_url = f'/api/calendars/{self.calendar.id}/dates/bulk'
+
+    def as_role(self, role):
+        self.api.force_authenticate(self.users[role])
+
+    def assertCountersMatchDates(self):
+        self.calendar.refresh_from_db()
+        stored = {field: getattr(self.calendar, field) for field in ClientCalendar.COUNTER_FIELDS}
+        actual = counters.compute([self.calendar]).get(
+            self.calendar.id, dict.fromkeys(ClientCalendar.COUNTER_FIELDS, 0)
+        )
+        self.assertEqual(stored, actual)
+
+
+class CalendarCounterTests(CalendarTestMixin, TestCase):
+    def test_date_flags_mirror_the_sql_conditions(self):
+        rows = [
+            {},
+            {'resource': '   ', 'creatives': []},
+            {'resource': '\tplan', 'tagline': '', 'caption': 'c'},
+            {'resource': 'plan', 'tagline': 't', 'caption': 'c', 'hashtags': 'h', 'e_hooks': 'e',
+             'creatives_text': 'x', 'creatives': ['a.png']},
+            {'internal_status': {'content_approval': True, 'creatives_approval': False},
+             'client_approval': {'content_approval': 0, 'creatives_approval': 'yes'}},
+            {'internal_status': {'content_approval': ''}, 'client_approval': {'creatives_approval': None}},
+        ]
+        dates = [ClientCalendarDate.objects.create(calendar=self.calendar, date=date(2026, 1, 1), **row) for row in rows]
+
+        annotated = ClientCalendarDate.objects.annotate(**completeness.counter_annotations())
+        failing = {
+            field: set(annotated.filter(condition).values_list('id', flat=True))
+            for field, condition in completeness.counter_conditions().items()
+        }
+        for calendar_date in dates:
+            flags = counters.date_flags(calendar_date)
+            for field, ids in failing.items():
+                self.assertEqual(flags[field], int(calendar_date.id in ids), (field, calendar_date.id))
+
+    def test_single_date_writes_keep_counters_in_step(self):
+        self.as_role('marketing_manager')
+        response = self.api.post(self.dates_url, {'calendar': self.calendar.id, 'date': '2026-01-05', 'resource': ' '}, format='json')
+        self.assertEqual(response.status_code, 201)
+        date_url = f"{self.dates_url}/{response.data['id']}"
+        self.assertCountersMatchDates()
+
+        self.api.patch(date_url, {'resource': 'Launch plan'}, format='multipart')
+        self.assertCountersMatchDates()
+
+        self.as_role('content_writer')
+        self.api.patch(date_url, {'tagline': 't', 'caption': 'c', 'hashtags': 'h', 'e_hooks': 'e', 'creatives_text': 'x'}, format='multipart')
+        self.assertCountersMatchDates()
+        self.assertEqual(self.calendar.dates_missing_content, 0)
+
+        self.as_role('marketing_manager')
+        self.assertEqual(self.api.delete(date_url).status_code, 204)
+        self.assertCountersMatchDates()
+        self.assertEqual(self.calendar.dates_total, 0)
+
+    def test_bulk_writes_keep_counters_in_step(self):
+        self.as_role('marketing_manager')
+        items = [{'date': f'2026-01-{day:02d}', 'resource': 'plan' if day % 2 else ''} for day in range(1, 11)]
+        response = self.api.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertCountersMatchDates()
+
+        updates = [
+            {'id': row['id'], 'resource': 'plan', 'internal_status': {'content_approval': True}}
+            for row in response.data[:6]
+        ]
+        self.assertEqual(self.api.patch(self.bulk_url, updates, format='json').status_code, 200)
+        self.assertCountersMatchDates()
+        self.assertEqual(self.calendar.dates_missing_resource, 2)
+
+    def test_full_save_leaves_counters_alone(self):
+        stale = ClientCalendar.objects.get(pk=self.calendar.pk)
+        self.as_role('marketing_manager')
+        self.api.post(self.bulk_url, [{'date': '2026-01-02'}, {'date': '2026-01-03'}], format='json')
+
+        stale.strategy_completed = True
+        stale.save()
+
+        self.assertCountersMatchDates()
+        self.assertEqual(self.calendar.dates_total, 2)
+        self.assertTrue(self.calendar.strategy_completed)
+
+    def test_verify_raises_command_error_on_drift(self):
+        ClientCalendarDate.objects.create(calendar=self.calendar, date=date(2026, 1, 1))
+
+        with self.assertRaises(CommandError):
+            call_command('recompute_calendar_counters', '--verify', stdout=mock.Mock())
+        call_command('recompute_calendar_counters', stdout=mock.Mock())
+        self.assertCountersMatchDates()
+
+
+class CalendarBulkViewTests(CalendarTestMixin, TestCase):
+    def test_rejects_more_than_the_item_limit(self):
+        self.as_role('marketing_manager')
+        items = [{'date': '2026-01-01'}] * (MAX_BULK_DATES + 1)
+
+        response = self.api.post(self.bulk_url, items, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.calendar.dates.exists())
+
+    def test_patch_rejects_fields_outside_the_role(self):
+        first, second = (
+            ClientCalendarDate.objects.create(calendar=self.calendar, date=date(2026, 1, day), resource='plan') for day in (1, 2)
+        )
+        self.as_role('content_writer')
+
+        response = self.api.patch(
+            self.bulk_url, [{'id': first.id, 'caption': 'c'}, {'id': second.id, 'resource': 'x'}], format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [{}, {'resource': ['content_writer is not allowed to update resource.']}])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertIsNone(first.caption)
+        self.assertEqual(second.resource, 'plan')
+
+    def test_errors_are_reported_by_position_and_nothing_is_written(self):
+        first = ClientCalendarDate.objects.create(calendar=self.calendar, date=date(2026, 1, 1))
+        self.as_role('content_writer')
+
+        response = self.api.patch(self.bulk_url, [
+            {'id': str(first.id), 'caption': 'c'},
+            {'id': 'abc', 'caption': 'c'},
+            {'id': 999999, 'caption': 'c'},
+            {'id': first.id, 'caption': 'again'},
+            {'id': first.id, 'version': 'x'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.data['errors']
+        self.assertEqual(errors[0], {})
+        self.assertEqual(errors[1], {'id': ['Must be an integer.']})
+        self.assertIn('id', errors[2])
+        self.assertIn('id', errors[3])
+        first.refresh_from_db()
+        self.assertIsNone(first.caption)
+
+        self.as_role('marketing_manager')
+        response = self.api.post(self.bulk_url, [{'date': '2026-01-02'}, {'date': 'bad'}, {'date': '2026-01-03', 'caption': 'c'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0], {})
+        self.assertIn('date', response.data['errors'][1])
+        self.assertIn('caption', response.data['errors'][2])
+        self.assertEqual(self.calendar.dates.count(), 1)
+
+    def test_returned_ids_match_the_created_rows(self):
+        ClientCalendarDate.objects.create(calendar=self.calendar, date=date(2026, 1, 20))
+        self.as_role('marketing_manager')
+        items = [{'date': f'2026-01-{day:02d}', 'resource': f'plan {day}'} for day in (3, 1, 2)]
+
+        # Also take the path for backends that don't return bulk-inserted pks (MySQL)
+        for returns_pks in (True, False):
+            with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', returns_pks):
+                response = self.api.post(self.bulk_url, items, format='json')
+            self.assertEqual(response.status_code, 201)
+            stored = ClientCalendarDate.objects.in_bulk([row['id'] for row in response.data])
+            self.assertEqual([stored[row['id']].resource for row in response.data], [item['resource'] for item in items])
+            self.assertEqual(len(stored), len(items))
+
+    def test_bulk_writes_bump_the_cache_version(self):
+        self.as_role('marketing_manager')
+        version = caching.get_calendar_version(self.calendar.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.post(self.bulk_url, [{'date': '2026-01-01'}], format='json')
+        created = caching.get_calendar_version(self.calendar.id)
+        self.assertNotEqual(created, version)
 
-# Create your tests here.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.patch(self.bulk_url, [{'id': response.data[0]['id'], 'resource': 'plan'}], format='json')
+        self.assertNotEqual(caching.get_calendar_version(self.calendar.id), created)
+        self.assertCountersMatchDates()
+        self.assertTrue(self.queue_group_send.called)
@@ -7,14 +7,19 @@ urlpatterns = [
     path('clients/<int:id>/calendars', views.ClientCalendarListCreateView.as_view(), name='calendar-list-create'),
 
     # ✅ Returns full details of a specific calendar
+    path('clients/<int:id>/calendars/generate', views.ClientCalendarGenerateView.as_view(), name='calendar-generate'),
     path('clients/<int:client_id>/calendars/<int:pk>', views.ClientCalendarRetrieveUpdateDeleteView.as_view(), name='calendar-rud'),
 
     # ✅ Returns all dates for a specific calendar
     path('<int:calendar_id>/dates', views.ClientCalendarDateListCreateView.as_view(), name='calendar-date-list-create'),
 
     # ✅ View a single date entry's details
+    path('<int:calendar_id>/dates/bulk', views.ClientCalendarDateBulkView.as_view(), name='calendar-date-bulk'),
     path('<int:calendar_id>/dates/<int:pk>', views.ClientCalendarDateRetrieveUpdateDeleteView.as_view(), name='calendar-date-rud'),
 
+    # ✅ Upload several creatives for a date entry at once
+    path('<int:calendar_id>/dates/<int:pk>/creatives', views.ClientCalendarDateCreativesUploadView.as_view(), name='calendar-date-creatives-upload'),
+
     # ✅ Dates for a specific client, month, and validated account manager
     path('client-calendar/<str:client_business_name>/<str:account_manager_username>/<str:month_name>/', views.ClientCalendarByMonthView.as_view(), name='client-calendar-by-month' ),
 
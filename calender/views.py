@@ -1,6 +1,9 @@
 # Django imports
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.http import parse_etags
 
 # DRF imports
 from rest_framework import generics, status
@@ -8,11 +11,19 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.exceptions import APIException, ValidationError
 
 # Local imports
 from . import models
 from . import serializers
+from . import counters
+from . import periods
+from . import generation
+from . import caching
+from . import realtime
 from pro_app.permissions import IsMarketingDirector
+from pro_app import storage
+from storage3.exceptions import StorageApiError
 from account.models import CustomUser
 
 # Constants
@@ -34,6 +45,20 @@ ROLE_FIELD_PERMISSIONS = {
     'content_writer': {'tagline', 'caption', 'hashtags', 'e_hooks', 'creatives_text'},
     'graphics_designer': {'creatives'}
 }
+MAX_CREATIVES_PER_UPLOAD = 30
+MAX_BULK_DATES = 200
+
+
+def ensure_period_available(client_id, month_name, reference=None, exclude_pk=None):
+    # Turn a (client, period) clash into a 400 instead of an IntegrityError
+    period = periods.parse_month(month_name, reference=reference)
+    if period is None:
+        return
+    clash = models.ClientCalendar.objects.filter(client_id=client_id, period=period)
+    if exclude_pk is not None:
+        clash = clash.exclude(pk=exclude_pk)
+    if clash.exists():
+        raise ValidationError({"month_name": [f"This client already has a calendar for {period:%B %Y}."]})
 
 
 class ClientCalendarListCreateView(generics.ListCreateAPIView):
@@ -42,12 +67,28 @@ class ClientCalendarListCreateView(generics.ListCreateAPIView):
     serializer_class = serializers.ClientCalendarSerializer
 
     def get_queryset(self):
-        return models.ClientCalendar.objects.filter(client_id=self.kwargs['id'])
+        calendars = models.ClientCalendar.objects.filter(client_id=self.kwargs['id']).select_related('client__account_manager')
+        # ?months=6[&until=2025-06] limits the list to a range of months, newest first
+        months = self.request.query_params.get('months')
+        if months is None:
+            return calendars
+        try:
+            months = int(months)
+            if months < 1:
+                raise ValueError
+        except ValueError:
+            raise ValidationError({"months": ["Must be a positive integer."]})
+        until = self.request.query_params.get('until')
+        if until and periods.parse_month(until) is None:
+            raise ValidationError({"until": [f"Unrecognised month '{until}'."]})
+        first, last = periods.month_range(months, until)
+        return calendars.filter(period__gte=first, period__lte=last).order_by('-period')
 
     def perform_create(self, serializer):
         if self.request.user.role != MARKETING_MANAGER_ROLE:
             raise PermissionDenied("Only marketing managers can create calendars.")
         client = get_object_or_404(models.Clients, id=self.kwargs['id'])
+        ensure_period_available(client.id, serializer.validated_data.get('month_name'))
         serializer.save(client=client)
 
 
@@ -57,7 +98,7 @@ class ClientCalendarRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIVi
     serializer_class = serializers.ClientCalendarSerializer
 
     def get_queryset(self):
-        return models.ClientCalendar.objects.filter(client_id=self.kwargs['client_id'])
+        return models.ClientCalendar.objects.filter(client_id=self.kwargs['client_id']).select_related('client__account_manager')
 
     def check_permissions(self, request):
         super().check_permissions(request)
@@ -69,9 +110,47 @@ class ClientCalendarRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIVi
             raise PermissionDenied("You are not authorized to update this calendar.")
 
     def perform_update(self, serializer):
+        calendar = serializer.instance
+        if 'month_name' in serializer.validated_data:
+            ensure_period_available(
+                serializer.validated_data.get('client', calendar.client).id,
+                serializer.validated_data['month_name'],
+                reference=calendar.created_at,
+                exclude_pk=calendar.pk
+            )
         serializer.save()
 
 
+class ClientCalendarGenerateView(APIView):
+    """
+    Builds a client's calendar for a month (default: next month) server-side,
+    cloning last month's layout or spreading the plan's post counts.
+    Body: {"month": "2025-07", "mode": "auto" | "clone" | "plan"}.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, id):
+        if request.user.role != MARKETING_MANAGER_ROLE:
+            raise PermissionDenied("Only marketing managers can create calendars.")
+        client = get_object_or_404(models.Clients, id=id)
+
+        month = request.data.get('month')
+        if month:
+            period = periods.parse_month(month)
+            if period is None:
+                return Response({"month": [f"Unrecognised month '{month}'."]}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            period = periods.add_months(periods.parse_month(timezone.localdate()), 1)
+
+        try:
+            calendar = generation.generate_calendar(client, period, mode=request.data.get('mode', 'auto'))
+        except generation.CalendarGenerationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = serializers.ClientCalendarSerializer(calendar, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
 class ClientCalendarDateListCreateView(generics.ListCreateAPIView):
     # Handles listing and creation of calendar dates
     permission_classes = [IsAuthenticated]
@@ -80,11 +159,22 @@ class ClientCalendarDateListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         return models.ClientCalendarDate.objects.filter(calendar_id=self.kwargs['calendar_id'])
 
+    def list(self, request, *args, **kwargs):
+        # Read-only fast path; same payload as the serializer, cached per calendar version
+        return cached_month_response(
+            request, self.kwargs['calendar_id'], 'dates',
+            lambda: serializers.calendar_date_rows(self.get_queryset())
+        )
+
     def perform_create(self, serializer):
         if self.request.user.role != MARKETING_MANAGER_ROLE:
             raise PermissionDenied("Only marketing managers can create calendar dates.")
-        calendar = get_object_or_404(models.ClientCalendar, id=self.kwargs['calendar_id'])
-        serializer.save(calendar=calendar)
+        with transaction.atomic():
+            # Every create path takes the calendar lock; the bulk create relies on it to find its rows
+            calendar = get_object_or_404(models.ClientCalendar.objects.select_for_update(), id=self.kwargs['calendar_id'])
+            calendar_date = serializer.save(calendar=calendar)
+            counters.record_created(calendar_date)
+            realtime.publish(calendar.id, [realtime.created(calendar_date)])
 
 
 class ClientCalendarDateRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
@@ -107,16 +197,281 @@ class ClientCalendarDateRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyA
     def perform_update(self, serializer):
         user_role = self.request.user.role
         
-        # Validate field permissions
+        # Validate field permissions; `version` is the optional conflict check, not a field
         for field in self.request.data:
-            if field not in self.get_allowed_fields():
+            if field != 'version' and field not in self.get_allowed_fields():
                 raise PermissionDenied(f"{user_role} is not allowed to update {field}.")
+        expected = expected_version(self.request.data.get('version'))
         
         # Special handling for graphics_designer creatives
         if user_role == 'graphics_designer' and 'creatives' in self.request.data:
             serializer.validated_data['creatives'] = self.request.data['creatives']
-        
-        serializer.save()
+
+        with transaction.atomic():
+            # Deltas come from the locked row, not the copy loaded before the lock
+            stored = lock_version(serializer.instance, expected)
+            old_flags = counters.date_flags(stored)
+            before = realtime.snapshot(stored)
+            calendar_date = serializer.save()
+            counters.record_updated(calendar_date, old_flags)
+            realtime.publish(calendar_date.calendar_id, [realtime.updated(calendar_date, before)])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            stored = lock_version(instance)
+            counters.record_deleted(stored)
+            realtime.publish(stored.calendar_id, [realtime.deleted(stored)])
+            instance.delete()
+
+
+class VersionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "This calendar date was changed by someone else."
+    default_code = 'version_conflict'
+
+    def __init__(self, current_version):
+        super().__init__()
+        # Hand the current version back as a number so the client can rebase
+        self.detail = {"detail": self.detail, "version": current_version}
+
+
+def expected_version(value):
+    # Optional `version` sent with an update: the row version the client last saw
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({"version": ["Must be an integer."]})
+
+
+def lock_version(calendar_date, expected=None):
+    """
+    Lock the date's row and check the client's version against it; call inside
+    a transaction. Returns the locked row as stored, for counter and patch deltas.
+    """
+    locked = models.ClientCalendarDate.objects.select_for_update().get(pk=calendar_date.pk)
+    if expected is not None and expected != locked.version:
+        raise VersionConflict(locked.version)
+    calendar_date.version = locked.version
+    return locked
+
+
+def cached_month_response(request, calendar_id, kind, build):
+    """
+    Serve a calendar payload from the versioned cache with an ETag; a matching
+    If-None-Match gets a 304 from the version number alone.
+    """
+    version = caching.get_calendar_version(calendar_id)
+    etag = caching.calendar_etag(calendar_id, kind, version)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(caching.month_payload(calendar_id, kind, version, build), headers=headers)
+
+
+def _bulk_items(data):
+    # Bulk endpoints take a JSON array of date objects
+    if not isinstance(data, list) or not data:
+        raise ValidationError({"non_field_errors": ["Expected a non-empty list of dates."]})
+    if len(data) > MAX_BULK_DATES:
+        raise ValidationError({"non_field_errors": [f"At most {MAX_BULK_DATES} dates can be sent at once."]})
+    if not all(isinstance(item, dict) for item in data):
+        raise ValidationError({"non_field_errors": ["Every item must be an object."]})
+    return data
+
+
+def _bulk_id(value):
+    # Ids may arrive as numeric strings; None marks one that can't be a date id
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _assign_created_pks(calendar, dates, last_id):
+    """
+    Fill in the pks of dates bulk-inserted into the locked calendar on
+    backends that don't return them (MySQL). The rows after last_id are
+    exactly this insert, and one INSERT hands out ascending ids in row order
+    (possibly with gaps). Anything else aborts the transaction.
+    """
+    created = list(calendar.dates.filter(id__gt=last_id).order_by('id').values_list('id', 'date'))
+    if len(created) != len(dates) or any(day != date.date for (_, day), date in zip(created, dates)):
+        raise IntegrityError(
+            f"Bulk insert into calendar {calendar.id} returned {len(created)} rows for {len(dates)} dates."
+        )
+    for date, (pk, _) in zip(dates, created):
+        date.pk = pk
+
+
+def _disallowed_fields(item, allowed):
+    return sorted(field for field in item if field not in allowed)
+
+
+class ClientCalendarDateBulkView(APIView):
+    """
+    POST creates and PATCH updates many dates of one calendar in a single
+    transaction. Every item is checked first, field permissions included;
+    if any fails nothing is written and the response lists errors by position.
+    Update items may carry the `version` they were edited from; a stale one
+    is reported as that item's error.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, calendar_id):
+        if request.user.role != MARKETING_MANAGER_ROLE:
+            raise PermissionDenied("Only marketing managers can create calendar dates.")
+        items = _bulk_items(request.data)
+        allowed = ROLE_FIELD_PERMISSIONS[MARKETING_MANAGER_ROLE] | {'date'}
+
+        with transaction.atomic():
+            # Every create path locks the calendar, so no other insert lands in it until we commit
+            calendar = get_object_or_404(models.ClientCalendar.objects.select_for_update(), id=calendar_id)
+            errors, dates = [], []
+            for item in items:
+                denied = _disallowed_fields(item, allowed)
+                if denied:
+                    errors.append({field: [f"{request.user.role} is not allowed to set {field}."] for field in denied})
+                    continue
+                serializer = serializers.BulkClientCalendarDateSerializer(data=item)
+                if not serializer.is_valid():
+                    errors.append(serializer.errors)
+                    continue
+                errors.append({})
+                dates.append(models.ClientCalendarDate(**{**serializer.validated_data, 'calendar': calendar}))
+            if any(errors):
+                return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            last_id = calendar.dates.order_by('-id').values_list('id', flat=True).first() or 0
+            models.ClientCalendarDate.objects.bulk_create(dates)
+            if dates[0].pk is None:
+                _assign_created_pks(calendar, dates, last_id)
+            counters.record_bulk_created(calendar.id, dates)
+            caching.bump_calendar_version(calendar.id)
+            realtime.publish(calendar.id, [realtime.created(date) for date in dates])
+
+        serializer = serializers.ClientCalendarDateSerializer(dates, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def patch(self, request, calendar_id):
+        allowed = ROLE_FIELD_PERMISSIONS.get(request.user.role)
+        if not allowed:
+            raise PermissionDenied(f"{request.user.role} is not allowed to update calendar dates.")
+        items = _bulk_items(request.data)
+        ids = [_bulk_id(item.get('id')) for item in items]
+
+        with transaction.atomic():
+            existing = models.ClientCalendarDate.objects.select_for_update().filter(
+                calendar_id=calendar_id, id__in=[pk for pk in ids if pk is not None]
+            ).in_bulk()
+            errors, dates, old_flags, snapshots, fields = [], [], [], [], {'version'}
+            seen = set()
+            for pk, item in zip(ids, items):
+                if pk is None:
+                    errors.append({"id": ["Must be an integer."]})
+                    continue
+                date = existing.get(pk)
+                if date is None or pk in seen:
+                    errors.append({"id": ["Unknown or repeated calendar date id."]})
+                    continue
+                seen.add(pk)
+                changes = {field: value for field, value in item.items() if field not in ('id', 'version')}
+                denied = _disallowed_fields(changes, allowed)
+                if denied:
+                    errors.append({field: [f"{request.user.role} is not allowed to update {field}."] for field in denied})
+                    continue
+                try:
+                    expected = expected_version(item.get('version'))
+                except ValidationError as e:
+                    errors.append(e.detail)
+                    continue
+                if expected is not None and expected != date.version:
+                    errors.append({"version": [f"Changed by someone else; the current version is {date.version}."]})
+                    continue
+                serializer = serializers.ClientCalendarDateSerializer(date, data=changes, partial=True)
+                if not serializer.is_valid():
+                    errors.append(serializer.errors)
+                    continue
+                errors.append({})
+                old_flags.append(counters.date_flags(date))
+                snapshots.append(realtime.snapshot(date))
+                for field, value in serializer.validated_data.items():
+                    setattr(date, field, value)
+                date.version += 1
+                fields.update(serializer.validated_data)
+                dates.append(date)
+            if any(errors):
+                return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            models.ClientCalendarDate.objects.bulk_update(dates, sorted(fields))
+            counters.record_bulk_updated(calendar_id, old_flags, dates)
+            caching.bump_calendar_version(calendar_id)
+            realtime.publish(calendar_id, [realtime.updated(date, before) for date, before in zip(dates, snapshots)])
+
+        serializer = serializers.ClientCalendarDateSerializer(dates, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ClientCalendarDateCreativesUploadView(APIView):
+    # Uploads several creatives for one calendar date in parallel and stores their keys in one save
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, calendar_id, pk):
+        if 'creatives' not in ROLE_FIELD_PERMISSIONS.get(request.user.role, set()):
+            raise PermissionDenied(f"{request.user.role} is not allowed to update creatives.")
+
+        calendar_date = get_object_or_404(models.ClientCalendarDate, calendar_id=calendar_id, pk=pk)
+        files = request.FILES.getlist('creatives')
+        if not files:
+            return Response({"creatives": ["No files uploaded."]}, status=status.HTTP_400_BAD_REQUEST)
+        if len(files) > MAX_CREATIVES_PER_UPLOAD:
+            return Response(
+                {"creatives": [f"At most {MAX_CREATIVES_PER_UPLOAD} files can be uploaded at once."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        for f in files:
+            ctype = f.content_type or ''
+            if not (ctype.startswith('image/') or ctype.startswith('video/')):
+                return Response(
+                    {"error": f"Invalid file type {ctype}. Only images/videos allowed."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        # 'replace' swaps the whole list, anything else appends
+        replace = request.data.get('mode') == 'replace'
+        folder = f"creatives/{calendar_date.calendar_id}/{calendar_date.id}"
+        try:
+            # Fresh keys per file: same-named files never collide or replace a creative the row still lists
+            keys = storage.upload_files((f, storage.unique_path(folder, f.name)) for f in files)
+        except StorageApiError as exc:
+            return Response({"creatives": [storage.storage_error_message(exc)]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        with transaction.atomic():
+            calendar_date = models.ClientCalendarDate.objects.select_for_update().get(pk=calendar_date.pk)
+            old_flags = counters.date_flags(calendar_date)
+            before = realtime.snapshot(calendar_date)
+            old_keys = list(calendar_date.creatives or [])
+            if replace:
+                calendar_date.creatives = keys
+            else:
+                calendar_date.creatives = old_keys + [key for key in keys if key not in old_keys]
+            calendar_date.save(update_fields=['creatives'])
+            counters.record_updated(calendar_date, old_flags)
+            realtime.publish(calendar_date.calendar_id, [realtime.updated(calendar_date, before)])
+
+        if replace:
+            stale = [key for key in old_keys if key not in keys and not key.startswith(('http://', 'https://'))]
+            if stale:
+                try:
+                    storage.remove(stale)
+                except Exception as e:
+                    print(f"Failed to delete replaced creatives: {e}")
+
+        serializer = serializers.ClientCalendarDateSerializer(calendar_date, context={'request': request})
+        return Response({"keys": keys, "calendar_date": serializer.data}, status=status.HTTP_200_OK)
 
 
 class ClientCalendarByMonthView(APIView):
@@ -132,20 +487,22 @@ class ClientCalendarByMonthView(APIView):
         ).exists():
             raise PermissionDenied("This account manager is not associated with the specified client.")
 
-        calendars = models.ClientCalendar.objects.filter(
-            client=client, 
-            month_name__icontains=month_name
+        calendar = periods.find_calendar(
+            models.ClientCalendar.objects.filter(client=client),
+            month_name,
+            fallback_lookup='month_name__icontains'
         )
-        
-        if not calendars.exists():
+
+        if calendar is None:
             return Response(
                 {"error": f"No calendar found for client {client.business_name} in {month_name}."},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        calendar_dates = models.ClientCalendarDate.objects.filter(calendar__in=calendars)
-        serializer = serializers.FilteredClientCalendarDateSerializer(calendar_dates, many=True)
-        return Response(serializer.data)
+        return cached_month_response(
+            request, calendar.id, 'month',
+            lambda: serializers.filtered_calendar_date_rows(models.ClientCalendarDate.objects.filter(calendar=calendar))
+        )
 
 # # Django imports
 # from django.shortcuts import render, get_object_or_404
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_workflow_states(apps, schema_editor):
+    # Each client's current step is its open task (else its latest task), entered when that task last changed
+    Task = apps.get_model('task', 'Task')
+    ClientWorkflowState = apps.get_model('client', 'ClientWorkflowState')
+    current = {}
+    for task in Task.objects.order_by('client_id', 'is_completed', '-updated_at').only(
+        'client_id', 'task_type', 'assigned_to_id', 'is_completed', 'updated_at'
+    ).iterator():
+        current.setdefault(task.client_id, task)
+
+    states = {state.client_id: state for state in ClientWorkflowState.objects.all()}
+    for client_id, task in current.items():
+        state = states.get(client_id) or ClientWorkflowState(client_id=client_id)
+        state.current_step = task.task_type
+        state.assigned_to_id = task.assigned_to_id
+        state.entered_at = task.updated_at
+        states[client_id] = state
+    ClientWorkflowState.objects.bulk_update([s for s in states.values() if s.pk], ['current_step', 'assigned_to', 'entered_at'], batch_size=500)
+    ClientWorkflowState.objects.bulk_create([s for s in states.values() if not s.pk], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('client', '0001_initial'),
+        ('task', '0002_unique_client_task_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientworkflowstate',
+            name='assigned_to',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='workflow_states', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='clientworkflowstate',
+            name='entered_at',
+            field=models.DateTimeField(blank=True, help_text='When the client entered the current step.', null=True),
+        ),
+        migrations.RunPython(backfill_workflow_states, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='clientworkflowstate',
+            index=models.Index(fields=['current_step', 'entered_at'], name='workflow_step_entered_idx'),
+        ),
+    ]
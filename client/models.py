@@ -150,13 +150,22 @@ class ClientInvoices(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
 class ClientWorkflowState(models.Model):
+    # Kept current by pro_app.utils.update_client_workflow on every task transition
     client = models.OneToOneField('Clients', on_delete=models.CASCADE)
     current_step = models.CharField(max_length=50, choices=TASK_TYPE_CHOICES)
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='workflow_states')
+    entered_at = models.DateTimeField(null=True, blank=True, help_text="When the client entered the current step.")
     last_updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Workflow for {self.client.business_name} - Current Step: {self.current_step}"
 
+    class Meta:
+        indexes = [
+            # The pipeline board reads every state ordered by step and time in step
+            models.Index(fields=['current_step', 'entered_at'], name='workflow_step_entered_idx'),
+        ]
+
 
 
 
@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from .constant import TASK_TYPE_CHOICES
+from .models import ClientWorkflowState
+
+# The board payload is cached under a version number that
+# pro_app.utils.update_client_workflow and pro_app.signals bump after a
+# client changes step, owner or name. Time in step is added when serving so
+# a cached board never shows stale durations.
+BOARD_CACHE_TIMEOUT = 60 * 5
+_VERSION_KEY = "pipeline_board_version"
+STEP_LABELS = dict(TASK_TYPE_CHOICES)
+
+
+def get_board_version():
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(_VERSION_KEY, version, None)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.add(_VERSION_KEY, 1, None)
+
+
+def bump_board_version():
+    """Invalidate the cached board once the current transaction commits."""
+    transaction.on_commit(_bump)
+
+
+def build_board():
+    """Board columns in workflow order, each client with its assignee, from one query over the step index."""
+    rows = ClientWorkflowState.objects.order_by('current_step', 'entered_at', 'client_id').values(
+        'client_id', 'client__business_name', 'current_step', 'entered_at',
+        'assigned_to_id', 'assigned_to__username', 'assigned_to__first_name',
+        'assigned_to__last_name', 'assigned_to__role',
+    )
+    columns = {step: [] for step, _ in TASK_TYPE_CHOICES}
+    for row in rows:
+        assignee = None
+        if row['assigned_to_id']:
+            assignee = {
+                'id': row['assigned_to_id'],
+                'username': row['assigned_to__username'],
+                'full_name': f"{row['assigned_to__first_name']} {row['assigned_to__last_name']}".strip(),
+                'role': row['assigned_to__role'],
+            }
+        columns.setdefault(row['current_step'], []).append({
+            'client_id': row['client_id'],
+            'business_name': row['client__business_name'],
+            'assigned_to': assignee,
+            'entered_at': row['entered_at'],
+        })
+    return [
+        {'step': step, 'label': STEP_LABELS.get(step, step), 'count': len(clients), 'clients': clients}
+        for step, clients in columns.items()
+    ]
+
+
+def board_payload():
+    key = f"pipeline_board:{get_board_version()}"
+    board = cache.get(key)
+    if board is None:
+        board = build_board()
+        cache.set(key, board, BOARD_CACHE_TIMEOUT)
+    return board
+
+
+def with_time_in_step(board, now):
+    return [
+        {**column, 'clients': [
+            {
+                **client,
+                'time_in_step': int((now - client['entered_at']).total_seconds()) if client['entered_at'] else None,
+            }
+            for client in column['clients']
+        ]}
+        for column in board
+    ]
@@ -18,6 +18,9 @@ urlpatterns = [
     # 
     path('<int:pk>/assign-team', views.AssignClientToTeamView.as_view(), name='assign-client-to-team'),
 
+    # Marketing director's board of all clients by current workflow step
+    path('pipeline', views.ClientPipelineBoardView.as_view(), name='client-pipeline-board'),
+
     path('<int:client_id>/update-workflow', views.UpdateClientWorkflowView.as_view(), name='update-client-workflow'),
 
  
@@ -5,6 +5,8 @@ from django.http import HttpResponse
 from django.conf import settings
 from django.urls import reverse
 from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
 
 # DRF (Django REST Framework) imports
 from rest_framework.views import APIView
@@ -18,22 +20,24 @@ from rest_framework.exceptions import PermissionDenied
 import random
 import string
 import os
-import tempfile
 from urllib.parse import urlparse
 
 # Project-specific imports
 from pro_app import storage
 from storage3.exceptions import StorageApiError
 from account.models import CustomUser
-from pro_app.utils import send_task_notification
+from pro_app.utils import lock_client, record_transition, send_task_notification, update_client_workflow
 from . import serializers
 from . import models
+from . import pipeline
 from user.models import UserOTP
 from plan.models import Plans
 from task.models import Task, CustomTask
+from task import workload
 from team.models import Team, TeamMembership
 from task.serializers import TaskSerializer, CustomTaskSerializer
 from calender.models import ClientCalendar
+from calender import periods
 from user.serializers import UserSerializer
 from client.models import Clients
 from pro_app.permissions import IsMarketingDirector
@@ -431,17 +435,34 @@ class UpdateClientWorkflowView(APIView):
         except CustomUser.DoesNotExist:
             return Response({"error": f"User with ID {assigned_to_id} does not exist."},
                     status=status.HTTP_400_BAD_REQUEST)
-        # Update or create the task for the client
-        task, created = Task.objects.update_or_create(
-            client=client,
-            task_type=task_type,
-            defaults={'assigned_to_id': assigned_to_id, 'is_completed': False}
-        )
+        # Update or create the task for the client and move its workflow state there
+        with transaction.atomic():
+            lock_client(client)
+            previous = Task.objects.select_for_update().filter(client=client, task_type=task_type).values_list(
+                'is_completed', 'assigned_to_id'
+            ).first()
+            task, created = Task.objects.update_or_create(
+                client=client,
+                task_type=task_type,
+                defaults={'assigned_to_id': assigned_to_id, 'is_completed': False}
+            )
+            workload.record_task_assigned(previous, assigned_user.id)
+            record_transition(task, 'assigned', actor=request.user)
+            update_client_workflow(client, task_type, assigned_to=assigned_user)
 
         serializer = TaskSerializer(task)
         return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
     
 
+class ClientPipelineBoardView(APIView):
+    # Every client grouped by its current workflow step, with assignee and time in step
+    permission_classes = [IsAuthenticated, IsMarketingDirector]
+
+    def get(self, request):
+        board = pipeline.with_time_in_step(pipeline.board_payload(), timezone.now())
+        return Response(board, status=status.HTTP_200_OK)
+
+
 class UploadProposalView(APIView):
     permission_classes = [IsAuthenticated]
     parser_classes     = (MultiPartParser, FormParser)
@@ -460,48 +481,23 @@ class UploadProposalView(APIView):
         # 2) handle new upload
         new_file = request.FILES.get('proposal_pdf')
         if new_file:
-            tmp_path = None
-            try:
-                # write to temp file
-                with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                    for chunk in new_file.chunks():
-                        tmp.write(chunk)
-                    tmp_path = tmp.name
-
-                path_in_bucket = f"proposals/{new_file.name}"
-
-                # delete old
-                if old_key:
-                    try:
-                        storage.remove([old_key])
-                    except Exception:
-                        pass
-
-                # upload (or update on 409)
+            path_in_bucket = f"proposals/{new_file.name}"
+
+            # delete old
+            if old_key:
                 try:
-                    storage.upload(
-                        file=tmp_path,
-                        path=path_in_bucket,
-                        file_options={"content-type": new_file.content_type}
-                    )
-                except StorageApiError as exc:
-                    raw = exc.args[0] if exc.args else {}
-                    if isinstance(raw, dict) and raw.get("statusCode") == 409:
-                        storage.update(
-                            file=tmp_path,
-                            path=path_in_bucket,
-                            file_options={"content-type": new_file.content_type}
-                        )
-                    else:
-                        msg = raw.get("message", str(exc)) if isinstance(raw, dict) else str(exc)
-                        return Response({"proposal_pdf": [msg]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-                # store just the key
-                client.proposal_pdf.name = path_in_bucket
-
-            finally:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+                    storage.remove([old_key])
+                except Exception:
+                    pass
+
+            # upload (overwrites an existing key)
+            try:
+                storage.upload_file(new_file, path_in_bucket)
+            except StorageApiError as exc:
+                return Response({"proposal_pdf": [storage.storage_error_message(exc)]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            # store just the key
+            client.proposal_pdf.name = path_in_bucket
 
         # 3) other field
         if 'proposal_approval_status' in request.data:
@@ -552,41 +548,15 @@ class ClientInvoicesListCreateView(generics.ListCreateAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        tmp_path = None
-        try:
-            # 1) save upload to a temp file
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                for chunk in invoice_file.chunks():
-                    tmp.write(chunk)
-                tmp_path = tmp.name
+        path_in_bucket = f"invoices/{invoice_file.name}"
 
-            path_in_bucket = f"invoices/{invoice_file.name}"
+        # 1) stream the upload straight to storage (overwrites an existing key)
+        try:
+            storage.upload_file(invoice_file, path_in_bucket)
+        except StorageApiError as exc:
+            return Response({"invoice": [storage.storage_error_message(exc)]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            # 2) try upload; on 409 overwrite via update()
-            try:
-                storage.upload(
-                    file=tmp_path,
-                    path=path_in_bucket,
-                    file_options={"content-type": invoice_file.content_type}
-                )
-            except StorageApiError as exc:
-                raw = exc.args[0] if exc.args else {}
-                if isinstance(raw, dict) and raw.get("statusCode") == 409:
-                    storage.update(
-                        file=tmp_path,
-                        path=path_in_bucket,
-                        file_options={"content-type": invoice_file.content_type}
-                    )
-                else:
-                    msg = raw.get("message", str(exc)) if isinstance(raw, dict) else str(exc)
-                    return Response({"invoice": [msg]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        finally:
-            # always clean up temp file
-            if tmp_path and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-
-        # 3) store only the bucket path; serializer will build the full URL
+        # 2) store only the bucket path; serializer will build the full URL
         invoice = models.ClientInvoices.objects.create(
             client            = client,
             invoice           = path_in_bucket,             # <-- just the path!
@@ -740,9 +710,8 @@ class ClientMonthlyReportsListCreateView(APIView):
 
     def get(self, request, client_id, month_name, *args, **kwargs):
         client = get_object_or_404(models.Clients, id=client_id)
-        try:
-            calendar = ClientCalendar.objects.get(client=client, month_name=month_name)
-        except ClientCalendar.DoesNotExist:
+        calendar = periods.find_calendar(ClientCalendar.objects.filter(client=client), month_name)
+        if calendar is None:
             return Response({"error": "No calendar found for that client & month."},
                             status=status.HTTP_404_NOT_FOUND)
 
@@ -751,9 +720,8 @@ class ClientMonthlyReportsListCreateView(APIView):
 
     def post(self, request, client_id, month_name, *args, **kwargs):
         client = get_object_or_404(models.Clients, id=client_id)
-        try:
-            calendar = ClientCalendar.objects.get(client=client, month_name=month_name)
-        except ClientCalendar.DoesNotExist:
+        calendar = periods.find_calendar(ClientCalendar.objects.filter(client=client), month_name)
+        if calendar is None:
             return Response({"error": "No calendar found for that client & month."},
                             status=status.HTTP_404_NOT_FOUND)
 
@@ -765,51 +733,25 @@ class ClientMonthlyReportsListCreateView(APIView):
         # Remember old key so we can delete it later
         old_key = calendar.monthly_reports.name if calendar.monthly_reports else None
 
-        tmp_path = None
-        try:
-            # 1) write to a temp file
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                for chunk in new_file.chunks():
-                    tmp.write(chunk)
-                tmp_path = tmp.name
-
-            path_in_bucket = f"reports/{new_file.name}"
+        path_in_bucket = f"reports/{new_file.name}"
 
-            # 2) delete old if exists
-            if old_key:
-                try:
-                    storage.remove([old_key])
-                except Exception:
-                    pass
-
-            # 3) upload (or update on 409)
+        # 1) delete old if exists
+        if old_key:
             try:
-                storage.upload(
-                    file=tmp_path,
-                    path=path_in_bucket,
-                    file_options={"content-type": new_file.content_type}
-                )
-            except StorageApiError as exc:
-                raw = exc.args[0] if exc.args else {}
-                if isinstance(raw, dict) and raw.get("statusCode") == 409:
-                    storage.update(
-                        file=tmp_path,
-                        path=path_in_bucket,
-                        file_options={"content-type": new_file.content_type}
-                    )
-                else:
-                    msg = raw.get("message", str(exc)) if isinstance(raw, dict) else str(exc)
-                    return Response({"monthly_reports": [msg]},
-                                    status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            # 4) save new key on the model
-            calendar.monthly_reports.name = path_in_bucket
-            calendar.save()
+                storage.remove([old_key])
+            except Exception:
+                pass
+
+        # 2) upload (overwrites an existing key)
+        try:
+            storage.upload_file(new_file, path_in_bucket)
+        except StorageApiError as exc:
+            return Response({"monthly_reports": [storage.storage_error_message(exc)]},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        finally:
-            # cleanup
-            if tmp_path and os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+        # 3) save new key on the model
+        calendar.monthly_reports.name = path_in_bucket
+        calendar.save()
 
         serializer = serializers.ClientReportSerializer(calendar, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -904,38 +846,13 @@ class ClientCustomTaskView(APIView):
         task_file = request.FILES.get("task_file")
         path_in_bucket = None
         if task_file:
-            tmp_path = None
-            try:
-                # Save upload to a temp file
-                with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                    for chunk in task_file.chunks():
-                        tmp.write(chunk)
-                    tmp_path = tmp.name
-
-                path_in_bucket = f"task_files/{task_file.name}"
+            path_in_bucket = f"task_files/{task_file.name}"
 
-                # Try upload; on 409 overwrite via update()
-                try:
-                    storage.upload(
-                        file=tmp_path,
-                        path=path_in_bucket,
-                        file_options={"content-type": task_file.content_type}
-                    )
-                except StorageApiError as exc:
-                    raw = exc.args[0] if exc.args else {}
-                    if isinstance(raw, dict) and raw.get("statusCode") == 409:
-                        storage.update(
-                            file=tmp_path,
-                            path=path_in_bucket,
-                            file_options={"content-type": task_file.content_type}
-                        )
-                    else:
-                        msg = raw.get("message", str(exc)) if isinstance(raw, dict) else str(exc)
-                        return Response({"error": msg}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            finally:
-                # Clean up temp file
-                if tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+            # Stream the upload to storage (overwrites an existing key)
+            try:
+                storage.upload_file(task_file, path_in_bucket)
+            except StorageApiError as exc:
+                return Response({"error": storage.storage_error_message(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         # Create the task
         task = models.CustomTask.objects.create(
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from pytz import timezone as pytz_timezone
 from datetime import datetime, timedelta
+from pro_app import roster
 from . import models, serializers
 
 # Optimized Code
@@ -51,12 +52,10 @@ class MeetingListCreateView(generics.ListCreateAPIView):
         if assignee_type == 'team':
             return {'team': client.team}
         elif assignee_type == 'marketing_manager':
-            manager = client.team.memberships.filter(
-                user__role='marketing_manager'
-            ).first()
+            manager = roster.get_team_member(client.team_id, 'marketing_manager')
             if not manager:
                 raise ValidationError({"error": "No marketing manager found for this team."})
-            return {'marketing_manager': manager.user}
+            return {'marketing_manager': manager}
         else:
             raise ValidationError({"error": "Invalid assignee type. Must be 'team' or 'marketing_manager'."})
 
@@ -0,0 +1,46 @@
+from collections import Counter
+
+from django.core.cache import cache
+
+from .models import Notification
+
+# The counter is adjusted on every write; the timeout bounds any drift from
+# a write that raced a cache miss.
+UNREAD_COUNT_TIMEOUT = 60 * 60
+
+
+def _unread_key(user_id):
+    return f"notifications_unread:{user_id}"
+
+
+def get_unread_count(user_id):
+    """Return the user's unread count, counting once on a cache miss."""
+    key = _unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cache.add(key, count, UNREAD_COUNT_TIMEOUT)
+    return count
+
+
+def incr_unread(user_ids):
+    """Add one unread notification for each user id (repeats count twice)."""
+    for user_id, amount in Counter(user_ids).items():
+        try:
+            cache.incr(_unread_key(user_id), amount)
+        except ValueError:
+            # Not cached yet; the next read counts from the table
+            pass
+
+
+def decr_unread(user_id, amount=1):
+    key = _unread_key(user_id)
+    try:
+        if cache.decr(key, amount) < 0:
+            cache.delete(key)
+    except ValueError:
+        pass
+
+
+def reset_unread(user_id):
+    cache.set(_unread_key(user_id), 0, UNREAD_COUNT_TIMEOUT)
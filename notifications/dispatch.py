@@ -0,0 +1,218 @@
+import asyncio
+import queue
+import threading
+
+from channels.layers import get_channel_layer
+from django.db import connection, transaction
+
+from pro_app.models import History
+from .counters import incr_unread
+from .models import Notification
+
+
+class ChannelSendWorker:
+    """
+    Drains queued channel-layer group sends on a background thread.
+
+    Request threads only put events on a local queue; the worker keeps one
+    event loop (and therefore one channel-layer connection pool) alive and
+    pushes everything that is waiting in a single batch.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def enqueue(self, group_name, event):
+        self._ensure_started()
+        self._queue.put((group_name, event))
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="channel-send-worker", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                loop.run_until_complete(self._send_batch(batch))
+            except Exception as e:
+                print(f"Failed to push {len(batch)} channel event(s): {e}")
+
+    async def _send_batch(self, batch):
+        channel_layer = get_channel_layer()
+        for group_name, event in batch:
+            await channel_layer.group_send(group_name, event)
+
+
+_worker = ChannelSendWorker()
+
+
+def queue_group_send(group_name, event):
+    """Push an event to a channel-layer group without blocking the caller."""
+    _worker.enqueue(group_name, event)
+
+
+def refresh_user_groups(user_ids):
+    """
+    Once the current transaction commits, tell the users' open sockets to
+    recompute their team/client groups (NotificationConsumer.refresh_groups),
+    so group pushes reach people added to a team or client after connecting.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id}
+
+    def after_commit():
+        for user_id in user_ids:
+            queue_group_send(user_group_name(user_id), {"type": "refresh_groups"})
+
+    if user_ids:
+        transaction.on_commit(after_commit)
+
+
+def user_group_name(user_id):
+    return f"notifications_{user_id}"
+
+
+def team_group_name(team_id):
+    return f"team_notifications_{team_id}"
+
+
+def client_group_name(client_id):
+    return f"client_notifications_{client_id}"
+
+
+def _task_client(task):
+    # Workflow tasks use `client`, custom tasks use `client_id`
+    if task is None:
+        return None
+    return task.client if hasattr(task, 'client') else task.client_id
+
+
+def build_notification(recipient, message, task=None, notification_type="info", sender=None):
+    """Return an unsaved Notification for the recipient."""
+    return Notification(
+        recipient=recipient,
+        sender=sender,
+        message=message,
+        notification_type=notification_type,
+        is_read=False,
+        client_id=_task_client(task),
+        task_type=getattr(task, 'task_type', None),
+    )
+
+
+def notification_payload(notification):
+    """Build the websocket payload sent to the recipient's group."""
+    client = notification.client_id
+    sender = notification.sender
+    recipient = notification.recipient
+    return {
+        "id": notification.id,
+        "client_id": client.id if client else None,
+        "client_name": client.business_name if client else None,
+        "task_type": notification.task_type,
+        "sender_id": sender.id if sender else None,
+        "sender_name": sender.get_full_name() if sender else None,
+        "recipient": recipient.id,
+        "recipient_full_name": recipient.get_full_name(),
+        "recipient_role": recipient.role,
+        "is_read": notification.is_read,
+        "notification_type": notification.notification_type,
+        "message": notification.message,
+    }
+
+
+def _history_action(notification):
+    sender = notification.sender
+    if sender:
+        return f"{sender.get_full_name()} ({sender.role}) performed action: '{notification.message}'"
+    return f"{notification.message}"
+
+
+def _insert_notifications(notifications):
+    if connection.features.can_return_rows_from_bulk_insert:
+        Notification.objects.bulk_create(notifications)
+        return
+    # Without INSERT ... RETURNING (MySQL) bulk_create leaves pks unset and the
+    # pushes need the real ids; batches are small, so insert row by row
+    for notification in notifications:
+        notification.save(force_insert=True)
+
+
+def _history_rows(notifications):
+    # A sender notifying several people performed one action, so identical rows are written once
+    rows = {}
+    for n in notifications:
+        user = n.sender or n.recipient
+        action = _history_action(n)
+        rows.setdefault((user.id, action), History(user=user, action=action))
+    return list(rows.values())
+
+
+def _group_event(notifications):
+    """
+    Build one event for a shared group: the common payload plus the
+    per-recipient fields, which NotificationConsumer merges for its user.
+    """
+    recipients = {
+        str(n.recipient_id): {
+            "id": n.id,
+            "recipient": n.recipient_id,
+            "recipient_full_name": n.recipient.get_full_name(),
+            "recipient_role": n.recipient.role,
+        }
+        for n in notifications
+    }
+    return {
+        "type": "send_notification",
+        "notification": notification_payload(notifications[0]),
+        "recipients": recipients,
+    }
+
+
+def dispatch_notifications(notifications, group_name=None):
+    """
+    Save notifications and their history rows (one bulk insert each where the
+    backend returns pks) and queue the websocket pushes for after the
+    surrounding transaction commits.
+
+    Without group_name every recipient gets a push on their own group. With
+    group_name the notifications must share one message, and a single event
+    is sent to that team/client group.
+    """
+    if not notifications:
+        return []
+
+    with transaction.atomic():
+        _insert_notifications(notifications)
+        History.objects.bulk_create(_history_rows(notifications))
+
+    if group_name:
+        events = [(group_name, _group_event(notifications))]
+    else:
+        events = [
+            (user_group_name(n.recipient_id), {"type": "send_notification", "notification": notification_payload(n)})
+            for n in notifications
+        ]
+    recipient_ids = [n.recipient_id for n in notifications]
+
+    def after_commit():
+        incr_unread(recipient_ids)
+        for name, event in events:
+            queue_group_send(name, event)
+
+    transaction.on_commit(after_commit)
+    return notifications
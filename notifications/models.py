@@ -22,6 +22,12 @@ class Notification(models.Model):
 
     # Task type should be remove (can be included in msg)
     task_type = models.CharField(max_length=255, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Backs the per-user feed (newest first) and its keyset pagination
+            models.Index(fields=['recipient', '-created_at'], name='notif_recipient_created_idx'),
+        ]
     
     def __str__(self):
         return f"Notification for {self.recipient} - {self.message[:50]}"
@@ -7,6 +7,7 @@ class NotificationSerializer(serializers.ModelSerializer):
     recipient_role = serializers.CharField(source="recipient.role", read_only=True)
     sender_name = serializers.CharField(source="sender.get_full_name", read_only=True, default=None)
     sender_id = serializers.IntegerField(source="sender.id", read_only=True, default=None)
+    client_name = serializers.CharField(source="client_id.business_name", read_only=True, default=None)
 
     class Meta:
         model = Notification
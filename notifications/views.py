@@ -3,27 +3,58 @@ from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
+from django.utils.dateparse import parse_datetime
+from .counters import decr_unread, get_unread_count, reset_unread
 from .models import Notification
 from .serializers import NotificationSerializer
 
 
+class NotificationCursorPagination(CursorPagination):
+    """Keyset pagination over the (recipient, -created_at) index."""
+    ordering = '-created_at'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
 # Create your views here.
 class MarkNotificationAsReadView(APIView):
     def post(self, request, *args, **kwargs):
         notification_id = kwargs.get('id')
         notification = get_object_or_404(Notification, id=notification_id)
-        notification.is_read = True
-        notification.save()
+        if not notification.is_read:
+            notification.is_read = True
+            notification.save(update_fields=['is_read'])
+            decr_unread(notification.recipient_id)
         return Response({"success": True, "message": "Notification marked as read."})
     
 class NotificationListView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request):
-        # Fetch notifications for the logged-in user
-        notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')
-        # Serialize the notifications
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        """
+        Page through the user's notifications, newest first.
+        `?since=<ISO datetime>` limits the feed to notifications created after it,
+        so the frontend can poll for deltas only.
+        """
+        notifications = Notification.objects.filter(recipient=request.user).select_related('recipient', 'sender', 'client_id')
+
+        since = request.query_params.get('since')
+        if since:
+            since_dt = parse_datetime(since)
+            if since_dt is None:
+                return Response({"error": "Invalid 'since' datetime."}, status=status.HTTP_400_BAD_REQUEST)
+            notifications = notifications.filter(created_at__gt=since_dt)
+
+        paginator = NotificationCursorPagination()
+        page = paginator.paginate_queryset(notifications, request, view=self)
+        serializer = NotificationSerializer(page, many=True)
+        return Response({
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "unread_count": get_unread_count(request.user.id),
+            "results": serializer.data,
+        }, status=status.HTTP_200_OK)
 
     def post(self, request):
         """
@@ -31,6 +62,7 @@ class NotificationListView(APIView):
         """
         # Update all unread notifications for the user to is_read=True
         updated_count = Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+        reset_unread(request.user.id)
         return Response(
             {"message": f"{updated_count} notifications marked as read."},
             status=status.HTTP_200_OK
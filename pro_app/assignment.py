@@ -0,0 +1,55 @@
+from django.core.cache import cache
+
+from account.models import CustomUser
+from task import workload
+from task.models import Task
+from .roster import get_team_role_ids
+
+# Picks which member of a client's team gets a workflow step when several
+# members share the role. Each team chooses its strategy (Team.assignment_strategy).
+# Every strategy decides from the cached roster plus at most one small query.
+
+
+def least_loaded(client, role_name, user_ids):
+    # Fewest open tasks + custom tasks from the maintained counters; ties go to the earliest member
+    current = workload.loads(user_ids)
+    return min(user_ids, key=lambda user_id: current[user_id])
+
+
+def round_robin(client, role_name, user_ids):
+    key = f"assignment_cursor:{client.team_id}:{role_name}"
+    try:
+        position = cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        position = 0
+    return user_ids[position % len(user_ids)]
+
+
+def sticky(client, role_name, user_ids):
+    # Whoever in the role last held a task for this client, else the least loaded member
+    user_id = Task.objects.filter(client=client, assigned_to_id__in=user_ids).order_by('-updated_at').values_list(
+        'assigned_to_id', flat=True
+    ).first()
+    return user_id or least_loaded(client, role_name, user_ids)
+
+
+STRATEGIES = {
+    'least_loaded': least_loaded,
+    'round_robin': round_robin,
+    'sticky': sticky,
+}
+DEFAULT_STRATEGY = 'least_loaded'
+
+
+def pick_team_member(client, role_name):
+    """Return the client's team member who should take the next role_name step, or None."""
+    user_ids = get_team_role_ids(client.team_id).get(role_name)
+    if not user_ids:
+        return None
+    if len(user_ids) == 1:
+        user_id = user_ids[0]
+    else:
+        strategy = STRATEGIES.get(client.team.assignment_strategy, STRATEGIES[DEFAULT_STRATEGY])
+        user_id = strategy(client, role_name, user_ids)
+    return CustomUser.objects.filter(id=user_id).first()
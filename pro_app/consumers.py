@@ -2,7 +2,13 @@ from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.db.models import Q
 import json
+
+from client.models import Clients
+from calender.realtime import calendar_group_name
+from notifications.dispatch import user_group_name, team_group_name, client_group_name
+from pro_app.roster import is_team_member
 User = get_user_model()
 
 
@@ -70,9 +76,11 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 user = await self.get_user_by_id(user_id)
                 if user:
                     self.user = user
-                    self.group_name = f"notifications_{self.user.id}"
-                    # Add the user to their unique WebSocket group
-                    await self.channel_layer.group_add(self.group_name, self.channel_name)
+                    self.group_name = user_group_name(self.user.id)
+                    # Personal group plus the team/client groups used for bulk notifications
+                    self.group_names = [self.group_name] + await self.get_shared_group_names(self.user)
+                    for group_name in self.group_names:
+                        await self.channel_layer.group_add(group_name, self.channel_name)
                     await self.accept()
                     print(f"WebSocket connected: {self.channel_name} for user {self.user.username}")
                 else:
@@ -90,16 +98,84 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             return User.objects.get(id=user_id)
         except User.DoesNotExist:
             return None
+    @database_sync_to_async
+    def get_shared_group_names(self, user):
+        team_ids = list(user.team_memberships.values_list('team_id', flat=True))
+        client_ids = Clients.objects.filter(
+            Q(team_id__in=team_ids) | Q(account_manager=user)
+        ).values_list('id', flat=True).distinct()
+        return [team_group_name(team_id) for team_id in team_ids] + [client_group_name(client_id) for client_id in client_ids]
+    async def refresh_groups(self, event):
+        # Team membership or a client's team/account manager changed (notifications.dispatch.refresh_user_groups)
+        group_names = [self.group_name] + await self.get_shared_group_names(self.user)
+        for group_name in set(group_names) - set(self.group_names):
+            await self.channel_layer.group_add(group_name, self.channel_name)
+        for group_name in set(self.group_names) - set(group_names):
+            await self.channel_layer.group_discard(group_name, self.channel_name)
+        self.group_names = group_names
     async def disconnect(self, close_code):
         if hasattr(self, "group_name"):
-            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            for group_name in getattr(self, "group_names", [self.group_name]):
+                await self.channel_layer.group_discard(group_name, self.channel_name)
             print(f"WebSocket disconnected: {self.channel_name}")
     async def send_notification(self, event):
         """Handle sending notifications to WebSocket."""
         notification = event.get("notification")
+        recipients = event.get("recipients")
+        if notification and recipients is not None:
+            # Group events carry every recipient; only deliver our own copy
+            entry = recipients.get(str(self.user.id))
+            if entry is None:
+                return
+            notification = {**notification, **entry}
         if notification:
             await self.send(text_data=json.dumps(notification))
             print(f"Notification sent to WebSocket: {notification}")
         else:
             print("No notification data found in event.")
 
+
+class CalendarConsumer(AsyncWebsocketConsumer):
+    """
+    Streams field-level patches for one calendar's dates (see calender.realtime)
+    so open grids stay current without refetching the month. Only the client's
+    team, its account manager and CALENDAR_GLOBAL_ROLES may subscribe; the
+    user comes from the authenticated scope (pro_app.middleware).
+    """
+    CALENDAR_GLOBAL_ROLES = ('marketing_director',)
+
+    async def connect(self):
+        try:
+            user = self.scope.get('user')
+            calendar_id = self.scope['url_route']['kwargs']['calendar_id']
+            if not user or not user.is_authenticated or not await self.can_subscribe(user, calendar_id):
+                print(f"Calendar subscription refused for user {getattr(user, 'id', None)} on calendar {calendar_id}")
+                await self.close()
+                return
+            self.group_name = calendar_group_name(calendar_id)
+            await self.channel_layer.group_add(self.group_name, self.channel_name)
+            await self.accept()
+        except Exception as e:
+            print(f"Calendar connection error: {str(e)}")
+            await self.close()
+    @database_sync_to_async
+    def can_subscribe(self, user, calendar_id):
+        client = Clients.objects.filter(calendars__id=calendar_id).values('team_id', 'account_manager_id').first()
+        if client is None:
+            return False
+        if user.is_superuser or user.role in self.CALENDAR_GLOBAL_ROLES:
+            return True
+        if client['account_manager_id'] == user.id:
+            return True
+        return bool(client['team_id']) and is_team_member(client['team_id'], user.id)
+    async def disconnect(self, close_code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+    async def receive(self, text_data=None, bytes_data=None):
+        # Edits go through the REST endpoints; the socket is receive-only
+        pass
+    async def calendar_patch(self, event):
+        await self.send(text_data=json.dumps({
+            "calendar_id": event["calendar_id"],
+            "patches": event["patches"],
+        }))
@@ -0,0 +1,34 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@database_sync_to_async
+def _user_for_token(raw_token):
+    try:
+        user_id = AccessToken(raw_token)['user_id']
+    except (TokenError, KeyError):
+        return None
+    return get_user_model().objects.filter(id=user_id, is_active=True).first()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticate websocket connections with the same JWT access tokens as the
+    API. Browsers can't set headers on a websocket, so the token comes from
+    `?token=` or the `access_token` cookie; a valid one replaces scope['user'].
+    """
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+        if not token:
+            token = scope.get('cookies', {}).get('access_token')
+        if token:
+            user = await _user_for_token(token)
+            if user is not None:
+                scope['user'] = user
+        return await self.inner(scope, receive, send)
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.18 on 2026-10-17 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pro_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='history',
+            index=models.Index(fields=['-created_at'], name='history_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='history',
+            index=models.Index(fields=['user', '-created_at'], name='history_user_created_idx'),
+        ),
+    ]
@@ -14,4 +14,10 @@ from client.models import Clients
 class History(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='histories')
     action = models.TextField()
-    created_at = models.DateTimeField(default=timezone.now)
\ No newline at end of file
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at'], name='history_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='history_user_created_idx'),
+        ]
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+
+from account.models import CustomUser
+from team.models import TeamMembership
+
+# Team rosters and global role holders change rarely; signals in
+# pro_app.signals drop the cached entries whenever they do.
+ROSTER_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _team_roster_key(team_id):
+    return f"team_roster:{team_id}"
+
+
+def _global_role_key(role_name):
+    return f"global_role_user:{role_name}"
+
+
+def get_team_role_ids(team_id):
+    """
+    Return a cached {role: [user_id, ...]} mapping for the given team.
+
+    Member ids are kept in membership order, so the first id of a role is
+    the member `.first()` used to return.
+    """
+    key = _team_roster_key(team_id)
+    roster = cache.get(key)
+    if roster is None:
+        roster = {}
+        memberships = TeamMembership.objects.filter(team_id=team_id).order_by('id').values_list('user_id', 'user__role')
+        for user_id, role in memberships:
+            roster.setdefault(role, []).append(user_id)
+        cache.set(key, roster, ROSTER_CACHE_TIMEOUT)
+    return roster
+
+
+def get_team_member_ids(team_id):
+    """Return the ids of every member of the team."""
+    return [user_id for user_ids in get_team_role_ids(team_id).values() for user_id in user_ids]
+
+
+def is_team_member(team_id, user_id):
+    return user_id in get_team_member_ids(team_id)
+
+
+def get_team_member(team_id, role_name):
+    """Return the first team member holding role_name, or None."""
+    user_ids = get_team_role_ids(team_id).get(role_name)
+    if not user_ids:
+        return None
+    return CustomUser.objects.filter(id=user_ids[0]).first()
+
+
+def get_global_user(role_name):
+    """Return the first user holding an agency-wide role such as 'accountant'."""
+    key = _global_role_key(role_name)
+    cached = cache.get(key)
+    if cached is None:
+        # Wrap the id so a missing role holder is cached too
+        cached = (CustomUser.objects.filter(role=role_name).values_list('id', flat=True).first(),)
+        cache.set(key, cached, ROSTER_CACHE_TIMEOUT)
+    user_id = cached[0]
+    if user_id is None:
+        return None
+    return CustomUser.objects.filter(id=user_id).first()
+
+
+def invalidate_team_roster(*team_ids):
+    cache.delete_many([_team_roster_key(team_id) for team_id in team_ids])
+
+
+def invalidate_global_role(*role_names):
+    cache.delete_many([_global_role_key(role_name) for role_name in role_names])
@@ -1,6 +1,7 @@
 from django.urls import re_path
-from .consumers import NotificationConsumer
+from .consumers import NotificationConsumer, CalendarConsumer
 
 websocket_urlpatterns = [
     re_path(r'ws/notifications/$', NotificationConsumer.as_asgi()),
+    re_path(r'ws/calendars/(?P<calendar_id>\d+)/$', CalendarConsumer.as_asgi()),
 ]
\ No newline at end of file
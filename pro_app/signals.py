@@ -1,19 +1,150 @@
-from django.db.models.signals import post_save
+from collections import Counter
+
+from django.db.models.signals import post_save, post_delete, post_init
 from django.dispatch import receiver
-from task.models import  Task
-from client.models import Clients
+from task.models import  Task, CustomTask
+from task import workload
+from client.models import Clients, ClientWorkflowState
+from client import pipeline
 from account.models import CustomUser
+from team.models import Team, TeamMembership
+from team import summary as team_summary
+from calender.models import ClientCalendar, ClientCalendarDate
+from calender import caching as calendar_caching
+from pro_app import roster
+from notifications.dispatch import refresh_user_groups
+from pro_app.utils import record_transition, update_client_workflow
 
 @receiver(post_save, sender=Clients)
 def assign_task_to_marketing_director(sender, instance, created, **kwargs):
     if created:
         # Get the marketing director
-        marketing_director = CustomUser.objects.filter(role='marketing_director').first()
+        marketing_director = roster.get_global_user('marketing_director')
         
         if marketing_director:
             # Assign a task to the marketing director
-            Task.objects.create(
+            task = Task.objects.create(
                 task_type='assign_team',
                 assigned_to=marketing_director,
                 client=instance
             )
+            workload.record_task_assigned(None, marketing_director.id)
+            record_transition(task, 'assigned')
+            update_client_workflow(instance, 'assign_team', assigned_to=marketing_director)
+
+# Keep the cached team rosters in sync with memberships
+@receiver([post_save, post_delete], sender=TeamMembership)
+def invalidate_team_roster(sender, instance, **kwargs):
+    roster.invalidate_team_roster(instance.team_id)
+    team_summary.bump_summary_version()
+    refresh_user_groups([instance.user_id])
+
+@receiver([post_save, post_delete], sender=Team)
+def invalidate_team_summary(sender, instance, **kwargs):
+    team_summary.bump_summary_version()
+
+@receiver(post_init, sender=Clients)
+def remember_client_team(sender, instance, **kwargs):
+    instance._loaded_team_id = instance.__dict__.get('team_id')
+    instance._loaded_business_name = instance.__dict__.get('business_name')
+    instance._loaded_audience = (instance.__dict__.get('team_id'), instance.__dict__.get('account_manager_id'))
+
+# Open notification sockets join the client's group through its team and account manager
+@receiver(post_save, sender=Clients)
+def refresh_client_audience_groups(sender, instance, created, **kwargs):
+    previous_team_id, previous_manager_id = instance._loaded_audience
+    instance._loaded_audience = (instance.team_id, instance.account_manager_id)
+    if not created and (previous_team_id, previous_manager_id) == instance._loaded_audience:
+        return
+    user_ids = {previous_manager_id, instance.account_manager_id}
+    for team_id in {previous_team_id, instance.team_id} - {None}:
+        user_ids.update(roster.get_team_member_ids(team_id))
+    refresh_user_groups(user_ids)
+
+# The pipeline board shows client names; step changes bump it in update_client_workflow
+@receiver(post_save, sender=Clients)
+def invalidate_pipeline_board_on_rename(sender, instance, created, **kwargs):
+    previous_name = instance._loaded_business_name
+    instance._loaded_business_name = instance.business_name
+    if not created and previous_name != instance.business_name:
+        pipeline.bump_board_version()
+
+@receiver(post_delete, sender=ClientWorkflowState)
+def invalidate_pipeline_board_on_delete(sender, instance, **kwargs):
+    pipeline.bump_board_version()
+
+@receiver(post_save, sender=Clients)
+def invalidate_team_summary_on_client_team_change(sender, instance, created, **kwargs):
+    previous_team_id = instance._loaded_team_id
+    instance._loaded_team_id = instance.team_id
+    if created or previous_team_id != instance.team_id:
+        team_summary.bump_summary_version()
+
+@receiver(post_delete, sender=Clients)
+def invalidate_team_summary_on_client_delete(sender, instance, **kwargs):
+    team_summary.bump_summary_version()
+
+@receiver(post_init, sender=CustomUser)
+def remember_user_role(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred role field is not fetched
+    instance._loaded_role = instance.__dict__.get('role')
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_rosters_on_role_change(sender, instance, created, **kwargs):
+    previous_role = instance._loaded_role
+    instance._loaded_role = instance.role
+    if created:
+        roster.invalidate_global_role(instance.role)
+        return
+    if previous_role == instance.role:
+        return
+    roster.invalidate_global_role(*{previous_role, instance.role} - {None})
+    team_ids = instance.team_memberships.values_list('team_id', flat=True)
+    roster.invalidate_team_roster(*team_ids)
+    team_summary.bump_summary_version()
+
+@receiver(post_delete, sender=CustomUser)
+def invalidate_global_role_on_delete(sender, instance, **kwargs):
+    roster.invalidate_global_role(instance.role)
+
+# Cached calendar month payloads are keyed by a per-calendar version
+@receiver([post_save, post_delete], sender=ClientCalendarDate)
+def invalidate_calendar_on_date_change(sender, instance, **kwargs):
+    calendar_caching.bump_calendar_version(instance.calendar_id)
+
+@receiver([post_save, post_delete], sender=ClientCalendar)
+def invalidate_calendar_on_change(sender, instance, **kwargs):
+    calendar_caching.bump_calendar_version(instance.id)
+
+# Keep the per-user open task counters behind least-loaded assignment in step.
+# Workflow tasks are counted by pro_app.utils as they're assigned and completed
+# (those writes bypass signals); deletes, including cascades, land here.
+@receiver(post_delete, sender=Task)
+def release_task_load(sender, instance, **kwargs):
+    if not instance.is_completed:
+        workload.adjust(instance.assigned_to_id, open_tasks=-1)
+
+def _custom_task_open(value):
+    # task_status may still hold the raw request value ("false") until reloaded
+    return not CustomTask._meta.get_field('task_status').to_python(value)
+
+@receiver(post_init, sender=CustomTask)
+def remember_custom_task_load(sender, instance, **kwargs):
+    instance._loaded_load = (instance.__dict__.get('task_status'), instance.__dict__.get('assign_to_id_id'))
+
+@receiver(post_save, sender=CustomTask)
+def track_custom_task_load(sender, instance, created, **kwargs):
+    old_status, old_user_id = instance._loaded_load
+    deltas = Counter()
+    if not created and old_user_id and _custom_task_open(old_status):
+        deltas[old_user_id] -= 1
+    if _custom_task_open(instance.task_status):
+        deltas[instance.assign_to_id_id] += 1
+    for user_id, delta in deltas.items():
+        workload.adjust(user_id, open_custom_tasks=delta)
+    instance._loaded_load = (instance.task_status, instance.assign_to_id_id)
+
+@receiver(post_delete, sender=CustomTask)
+def release_custom_task_load(sender, instance, **kwargs):
+    if _custom_task_open(instance.task_status):
+        workload.adjust(instance.assign_to_id_id, open_custom_tasks=-1)
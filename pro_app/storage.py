@@ -1,17 +1,285 @@
-# pro_app/utils/storage.py
+# pro_app/storage.py
+"""
+Single entry point for object storage.
+
+Every module goes through get_bucket(), which returns one process-wide
+backend chosen by settings.STORAGE_BACKEND:
+  'supabase' - storage3 bucket on a shared, pooled keep-alive httpx.Client
+  'local'    - files under settings.LOCAL_STORAGE_ROOT, same interface
+"""
+import hashlib
+import io
 import os
-import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
 
+import httpx
 from django.conf import settings
-from supabase import create_client, Client as SupabaseClient
+from django.core.cache import cache
+from storage3 import SyncStorageClient
+from storage3._sync.file_api import SyncBucketProxy
 from storage3.exceptions import StorageApiError
 
-# initialize once
-_supabase: SupabaseClient = create_client(
-    settings.SUPABASE_URL,
-    settings.SUPABASE_KEY,
-)
-storage = _supabase.storage.from_(settings.SUPABASE_BUCKET)
+# Upper bound on concurrent storage requests made by a single upload_files call
+UPLOAD_MAX_WORKERS = 6
+
+# Connection pool shared by every storage call in the process
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# Object metadata (size/mtime, or "missing") is cached briefly; our own writes drop the entry
+METADATA_CACHE_TIMEOUT = 60
+_MISSING = 'missing'
+
+
+class SupabaseBucket(SyncBucketProxy):
+    """storage3 bucket with a HEAD-based stat()."""
+
+    def stat(self, path):
+        """Return {'size', 'modified'} for the object, or None if it does not exist."""
+        response = self._client.head(f"/object/{self.id}/{path}")
+        # the storage API answers 400 for some missing keys
+        if response.status_code in (400, 404):
+            return None
+        if response.status_code != 200:
+            raise StorageApiError(f"HEAD {path} failed", "HeadFailed", response.status_code)
+        last_modified = response.headers.get('last-modified')
+        return {
+            'size': int(response.headers.get('content-length') or 0),
+            'modified': parsedate_to_datetime(last_modified) if last_modified else None,
+        }
+
+
+class LocalBucket:
+    """
+    Filesystem stand-in for a storage3 bucket, used for offline runs and
+    benchmarks. Mirrors the bucket methods the app calls, including the
+    409 raised when uploading over an existing key.
+    """
+
+    def __init__(self, root, base_url):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip('/') + '/'
+
+    def _path(self, path):
+        full = (self.root / path.lstrip('/')).resolve()
+        if self.root.resolve() not in full.parents:
+            raise StorageApiError(f"Invalid key '{path}'", "InvalidKey", 400)
+        return full
+
+    def _write(self, path, file):
+        full = self._path(path)
+        full.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(file, (bytes, bytearray)):
+            full.write_bytes(file)
+            return
+        if isinstance(file, (str, Path)):
+            file = open(file, 'rb')
+        with file, open(full, 'wb') as out:
+            while chunk := file.read(64 * 1024):
+                out.write(chunk)
+
+    def upload(self, path, file, file_options=None):
+        if self._path(path).exists():
+            raise StorageApiError("The resource already exists", "Duplicate", 409)
+        self._write(path, file)
+        return {"path": path}
+
+    def update(self, path, file, file_options=None):
+        if not self._path(path).exists():
+            raise StorageApiError("Object not found", "not_found", 404)
+        self._write(path, file)
+        return {"path": path}
+
+    def remove(self, paths):
+        removed = []
+        for path in paths:
+            full = self._path(path)
+            if full.exists():
+                full.unlink()
+                removed.append({"name": path})
+        return removed
+
+    def download(self, path, options=None):
+        full = self._path(path)
+        if not full.exists():
+            raise StorageApiError("Object not found", "not_found", 404)
+        return full.read_bytes()
+
+    def exists(self, path):
+        return self._path(path).is_file()
+
+    def stat(self, path):
+        full = self._path(path)
+        if not full.is_file():
+            return None
+        info = full.stat()
+        return {'size': info.st_size, 'modified': datetime.fromtimestamp(info.st_mtime, tz=dt_timezone.utc)}
+
+    def get_public_url(self, path, options=None):
+        return f"{self.base_url}{path.lstrip('/')}"
+
+
+_bucket = None
+_bucket_lock = threading.Lock()
+
+
+def _build_bucket():
+    backend = getattr(settings, 'STORAGE_BACKEND', 'supabase')
+    if backend == 'local':
+        return LocalBucket(
+            getattr(settings, 'LOCAL_STORAGE_ROOT', os.path.join(settings.BASE_DIR, 'media')),
+            getattr(settings, 'LOCAL_STORAGE_URL', '/media/'),
+        )
+    if backend != 'supabase':
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend}'")
+
+    # httpx.Client is thread-safe; keep-alive connections are reused across requests and threads
+    http_client = httpx.Client(limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT, follow_redirects=True)
+    client = SyncStorageClient(
+        f"{settings.SUPABASE_URL}/storage/v1",
+        {"apiKey": settings.SUPABASE_KEY, "Authorization": f"Bearer {settings.SUPABASE_KEY}"},
+        http_client=http_client,
+    )
+    return SupabaseBucket(settings.SUPABASE_BUCKET, client._client)
+
+
+def get_bucket():
+    """Return the shared storage backend, creating it on first use."""
+    global _bucket
+    if _bucket is None:
+        with _bucket_lock:
+            if _bucket is None:
+                _bucket = _build_bucket()
+    return _bucket
+
+
+def _metadata_key(path):
+    # bucket paths can hold spaces and unicode, which some cache backends reject in keys
+    return f"storage_meta:{hashlib.md5(path.encode()).hexdigest()}"
+
+
+def forget_metadata(paths):
+    cache.delete_many([_metadata_key(path.lstrip('/')) for path in paths])
+
+
+def stat(path):
+    """
+    Return {'size', 'modified'} for an object, or None if it does not exist.
+    Results (including misses) are cached for METADATA_CACHE_TIMEOUT seconds.
+    """
+    path = path.lstrip('/')
+    key = _metadata_key(path)
+    meta = cache.get(key)
+    if meta is None:
+        meta = get_bucket().stat(path) or _MISSING
+        cache.set(key, meta, METADATA_CACHE_TIMEOUT)
+    return None if meta == _MISSING else meta
+
+
+def exists(path):
+    return stat(path) is not None
+
+
+def size(path):
+    meta = stat(path)
+    if meta is None:
+        raise FileNotFoundError(path)
+    return meta['size']
+
+
+def modified_time(path):
+    meta = stat(path)
+    if meta is None:
+        raise FileNotFoundError(path)
+    return meta['modified']
+
+
+def remove(paths):
+    """Delete objects by bucket path."""
+    paths = list(paths)
+    try:
+        return get_bucket().remove(paths)
+    finally:
+        forget_metadata(paths)
+
+
+def download(path):
+    return get_bucket().download(path)
+
+
+def public_url(path):
+    # storage3 leaves an empty query string ('?') on plain public URLs
+    return get_bucket().get_public_url(path.lstrip('/')).rstrip('?')
+
+
+@contextmanager
+def _upload_body(uploaded_file):
+    """
+    Yield an upload body storage3 can send without another copy on disk.
+
+    Large uploads are already spooled to a temp file by Django, so that file
+    is streamed as-is; small ones are sent from Django's in-memory buffer.
+    """
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        with open(uploaded_file.temporary_file_path(), 'rb') as body:
+            yield body
+        return
+    uploaded_file.seek(0)
+    if isinstance(getattr(uploaded_file, 'file', None), io.BytesIO):
+        yield uploaded_file.file.getvalue()
+    else:
+        yield b''.join(uploaded_file.chunks())
+
+
+def _status_code(exc: StorageApiError) -> str:
+    # storage3 keeps the status on the exception; older releases only had the raw dict
+    raw = exc.args[0] if exc.args else {}
+    if isinstance(raw, dict):
+        return str(raw.get("statusCode"))
+    return str(getattr(exc, "status", ""))
+
+
+def storage_error_message(exc: StorageApiError) -> str:
+    raw = exc.args[0] if exc.args else {}
+    if isinstance(raw, dict):
+        return raw.get("message", str(exc))
+    return getattr(exc, "message", None) or str(exc)
+
+
+def upload_file(uploaded_file, path_in_bucket: str, content_type: str | None = None) -> str:
+    """
+    Upload a Django UploadedFile to path_in_bucket, overwriting any existing
+    object at that key. Returns the bucket path (no leading slash).
+
+    exists() picks upload or update up front; a conflict or miss caused by a
+    stale metadata entry falls back to the other call once.
+    """
+    path_in_bucket = path_in_bucket.lstrip('/')
+    file_options = {"content-type": content_type or getattr(uploaded_file, 'content_type', None) or "application/octet-stream"}
+    bucket = get_bucket()
+    first, second, retry_status = bucket.upload, bucket.update, "409"
+    if exists(path_in_bucket):
+        first, second, retry_status = bucket.update, bucket.upload, "404"
+    try:
+        with _upload_body(uploaded_file) as body:
+            try:
+                first(file=body, path=path_in_bucket, file_options=dict(file_options))
+            except StorageApiError as exc:
+                if _status_code(exc) != retry_status:
+                    raise
+                if hasattr(body, 'seek'):
+                    body.seek(0)
+                second(file=body, path=path_in_bucket, file_options=dict(file_options))
+    finally:
+        forget_metadata([path_in_bucket])
+    return path_in_bucket
+
 
 def save_file_to_supabase(
     uploaded_file,
@@ -24,47 +292,49 @@ def save_file_to_supabase(
     Returns a clean bucket-path (no leading slash).
     """
     if target_key:
-        # ensure no leading slash
-        path_in_bucket = target_key.lstrip('/')
+        path_in_bucket = target_key
     else:
         path_in_bucket = f"{folder}/{uploaded_file.name}"
+    return upload_file(uploaded_file, path_in_bucket)
+
+
+def unique_path(folder: str, filename: str) -> str:
+    """
+    Return folder/<random prefix>-<filename>, a key no earlier upload can
+    hold, so uploading there never replaces an object something points to.
+    """
+    return f"{folder.rstrip('/')}/{uuid.uuid4().hex[:12]}-{filename}"
 
-    tmp_path = None
-    try:
-        # dump to temp
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            for chunk in uploaded_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
-
-        # if overwriting existing key...
-        if target_key:
-            try:
-                storage.update(
-                    file=tmp_path,
-                    path=path_in_bucket,
-                    file_options={"content-type": uploaded_file.content_type},
-                )
-            except StorageApiError as exc:
-                raw = exc.args[0] if exc.args else {}
-                # if it wasn’t there, fall back to upload
-                if isinstance(raw, dict) and raw.get("statusCode") == 404:
-                    storage.upload(
-                        file=tmp_path,
-                        path=path_in_bucket,
-                        file_options={"content-type": uploaded_file.content_type},
-                    )
-                else:
-                    raise
-        else:
-            # brand-new upload
-            storage.upload(
-                file=tmp_path,
-                path=path_in_bucket,
-                file_options={"content-type": uploaded_file.content_type},
-            )
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
 
-    return path_in_bucket
\ No newline at end of file
+def _upload_new(uploaded_file, path_in_bucket):
+    # Note whether the key was free beforehand, so a failed batch only removes what it created
+    existed = exists(path_in_bucket)
+    return upload_file(uploaded_file, path_in_bucket), existed
+
+
+def upload_files(uploads, max_workers: int = UPLOAD_MAX_WORKERS) -> list[str]:
+    """
+    Upload several (uploaded_file, path_in_bucket) pairs concurrently.
+    Returns the bucket paths in input order. Every path must be distinct.
+    If any upload fails, the files it created are removed again (objects it
+    overwrote are left alone) and the first error is raised.
+    """
+    uploads = list(uploads)
+    if not uploads:
+        return []
+    paths = [path.lstrip('/') for _, path in uploads]
+    if len(set(paths)) != len(paths):
+        raise ValueError("upload_files() needs a distinct path for every upload.")
+    workers = max(1, min(max_workers, len(uploads)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage-upload") as pool:
+        futures = [pool.submit(_upload_new, uploaded_file, path) for uploaded_file, path in uploads]
+    errors = [f.exception() for f in futures if f.exception()]
+    if errors:
+        created = [path for path, existed in (f.result() for f in futures if not f.exception()) if not existed]
+        if created:
+            try:
+                remove(created)
+            except Exception as e:
+                print(f"Failed to clean up partial upload {created}: {e}")
+        raise errors[0]
+    return [f.result()[0] for f in futures]
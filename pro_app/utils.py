@@ -1,65 +1,116 @@
-from client.models import ClientStatus, ClientWorkflowState
+from client.models import Clients, ClientStatus, ClientWorkflowState
+from client import pipeline
 from . import models
+from . import workflow
 # from django.shortcuts import get_object_or_404
-from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
 # from django.core.mail import send_mail
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from notifications.dispatch import build_notification, dispatch_notifications
 from account.models import CustomUser
-from task.models import Task
+from task.models import Task, TaskTransition
+from task import workload
 
 # NEW 
+def _task_upsert_options():
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target; other backends need one
+    options = {'update_conflicts': True, 'update_fields': ['assigned_to', 'is_completed', 'updated_at']}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['client', 'task_type']
+    return options
+
+
+def lock_client(client):
+    """
+    Lock the client's row for the rest of the transaction. Workflow task
+    writes serialise on it: under READ COMMITTED a locking read of a task
+    row that doesn't exist yet takes no gap lock, so probing the task alone
+    would let two requests both see no row.
+    """
+    Clients.objects.select_for_update().filter(pk=client.pk).values_list('pk', flat=True).first()
+
+
 def create_task(client, task_type, user):
     """
     Create or update a task for the given client and user.
     If the task was completed, it updates the existing task to the next step.
+
+    One INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE against the unique
+    (client, task_type) constraint, so concurrent calls can't create duplicates.
+    The client's workflow state moves to the task in the same transaction.
+    Database errors propagate so an enclosing completion rolls back with it.
     """
-    try:
-        # Check if a task of the same type already exists for the client
-        existing_task = Task.objects.filter(client=client, task_type=task_type).first()
-        
-        if existing_task:
-            # If the existing task is completed, update it instead of creating a new one
-            if existing_task.is_completed:
-                print(f"Updating completed task '{task_type}' for client '{client.business_name}'.")
-                existing_task.is_completed = False  # Reset the completion status
-                existing_task.assigned_to = user  # Reassign to the new user
-                existing_task.save(update_fields=['is_completed', 'assigned_to'])
-                return existing_task
-            else:
-                # If the task is not completed, update the assigned user if necessary
-                if existing_task.assigned_to != user:
-                    print(f"Re-assigning task '{task_type}' from '{existing_task.assigned_to}' to '{user}'")
-                    existing_task.assigned_to = user
-                    existing_task.save(update_fields=['assigned_to'])
-                print(f"Task '{task_type}' for client '{client.business_name}' already exists and is not completed. Skipping task creation.")
-                return existing_task
+    with transaction.atomic():
+        lock_client(client)
+        # Note who held the task before this write for the load counters
+        previous = Task.objects.select_for_update().filter(client=client, task_type=task_type).values_list(
+            'is_completed', 'assigned_to_id'
+        ).first()
+        task = _upsert_task(client, task_type, user)
+        workload.record_task_assigned(previous, user.id)
+        record_transition(task, 'assigned')
+        update_client_workflow(client, task_type, assigned_to=user)
+    return task
 
-        # If no existing task, create a new task
-        print(f"Creating task: {task_type} for client: {client.business_name} assigned to: {user.username}")
-        task = Task.objects.create(client=client, assigned_to=user, task_type=task_type, is_completed=False)
-        print(f"Task created successfully: {task}")
-        return task
+def _upsert_task(client, task_type, user):
+    if connection.features.supports_update_conflicts:
+        Task.objects.bulk_create(
+            [Task(client=client, assigned_to=user, task_type=task_type, is_completed=False)],
+            **_task_upsert_options()
+        )
+        return Task.objects.select_related('client', 'assigned_to').get(client=client, task_type=task_type)
 
-    except Task.DoesNotExist:
-        # If no task exists, create a new one
-        print(f"No existing task found. Creating new task: {task_type} for client: {client.business_name} assigned to: {user.username}")
-        task = Task.objects.create(client=client, assigned_to=user, task_type=task_type, is_completed=False)
-        return task
+    task, created = Task.objects.select_for_update().get_or_create(
+        client=client, task_type=task_type,
+        defaults={'assigned_to': user, 'is_completed': False}
+    )
+    if not created and (task.is_completed or task.assigned_to_id != user.id):
+        task.is_completed = False
+        task.assigned_to = user
+        task.save(update_fields=['is_completed', 'assigned_to', 'updated_at'])
+    return task
 
-    except ValidationError as e:
-        print(f"Validation error when creating task: {e}")
-    except Exception as e:
-        print(f"Error when creating task: {e}")
+def record_transition(task, event, actor=None, time_in_step=None):
+    """Append a TaskTransition for the task as it stands now (its client, team and assignee)."""
+    return TaskTransition.objects.create(
+        task=task,
+        client_id=task.client_id,
+        team_id=task.client.team_id,
+        task_type=task.task_type,
+        event=event,
+        assigned_to_id=task.assigned_to_id,
+        actor=actor,
+        time_in_step=time_in_step,
+    )
+
+class TaskAlreadyCompleted(Exception):
+    pass
 
 # NEW 24-01-25
 def mark_task_as_completed(task, current_user, reassign_to_marketing=False):
     """
     Mark a task as completed and create or update the next task in the workflow.
+    Raises TaskAlreadyCompleted if another request completed it first.
     """
+    with transaction.atomic():
+        return _complete_task(task, current_user, reassign_to_marketing)
+
+
+def _complete_task(task, current_user, reassign_to_marketing):
     print(f"Completing task: {task.task_type} for client: {task.client.business_name}")
+    # updated_at was last set when the task was assigned or reopened by create_task
+    assigned_at = task.updated_at
+    completed_at = timezone.now()
+    # Client before task, the same lock order as create_task
+    lock_client(task.client)
+    # Only the request that flips the row completes the task; a concurrent duplicate stops here
+    if not Task.objects.filter(pk=task.pk, is_completed=False).update(is_completed=True, updated_at=completed_at):
+        raise TaskAlreadyCompleted(f"Task '{task.task_type}' for client '{task.client.business_name}' is already completed.")
     task.is_completed = True
-    task.save()
+    task.updated_at = completed_at
+    workload.adjust(task.assigned_to_id, open_tasks=-1)
+    time_in_step = max(int((task.updated_at - assigned_at).total_seconds()), 0) if assigned_at else None
+    record_transition(task, 'completed', actor=current_user, time_in_step=time_in_step)
     TASK_TYPE_MAPPING = {
         "assign_client_to_team": "Assign Client to Team",
         "create_proposal": "Create Proposal",
@@ -101,227 +152,113 @@ def mark_task_as_completed(task, current_user, reassign_to_marketing=False):
         print(f"No next step or user found for task: {task.task_type}. Workflow may have reached an end or is misconfigured.")
         return
     print(f"Next step: {next_step}, Next user: {next_user}")
-    # Check if a similar task already exists for the client and next step
-    existing_task = Task.objects.filter(client=task.client, task_type=next_step).first()
-    if existing_task:
-        if existing_task.is_completed:
-            print(f"Reactivating existing task for next step '{next_step}' for client '{task.client.business_name}'")
-            existing_task.is_completed = False
-            existing_task.assigned_to = next_user
-            existing_task.save(update_fields=["is_completed", "assigned_to"])
-            # Notify the next user about the reactivated task
-            send_task_notification(
-                recipient=next_user,
-                message=f"A task '{TASK_TYPE_MAPPING.get(next_step, next_step)}' has been reactivated and assigned to you.",
-                task=task,  # Pass the current task object to include the task details
-                notification_type="task_assigned"
-            )
-        else:
-            print(f"Task '{next_step}' for client '{task.client.business_name}' is already in progress.")
-        return existing_task
+    # Under the client lock taken above this sees any next step written concurrently
+    was_completed = Task.objects.select_for_update().filter(
+        client=task.client, task_type=next_step
+    ).values_list('is_completed', flat=True).first()
+    if was_completed is False:
+        print(f"Task '{next_step}' for client '{task.client.business_name}' is already in progress.")
+        return Task.objects.get(client=task.client, task_type=next_step)
+
+    next_task = create_task(task.client, next_step, next_user)
+    if was_completed:
+        print(f"Reactivated existing task for next step '{next_step}' for client '{task.client.business_name}'")
+        message = f"A task '{TASK_TYPE_MAPPING.get(next_step, next_step)}' has been reactivated and assigned to you."
+        notified_task = task  # Pass the current task object to include the task details
     else:
-        # Create a new task for the next step
-        print(f"Creating new task for next step '{next_step}' for client '{task.client.business_name}', assigned to: {next_user.username}")
-        new_task = create_task(task.client, next_step, next_user)
-        # Notify the next user about the new task
-        send_task_notification(
-            recipient=new_task.assigned_to,
-            message=f"New task '{TASK_TYPE_MAPPING.get(next_step, next_step)}' has been assigned to you.",
-            task=new_task,
-            notification_type="task_assigned"
-        )
-        return new_task
+        print(f"Created new task for next step '{next_step}' for client '{task.client.business_name}', assigned to: {next_user.username}")
+        message = f"New task '{TASK_TYPE_MAPPING.get(next_step, next_step)}' has been assigned to you."
+        notified_task = next_task
+    # Notify the next user (notification, history row and websocket push) once the completion commits
+    transaction.on_commit(lambda: send_task_notification(
+        recipient=next_user,
+        message=message,
+        task=notified_task,
+        notification_type="task_assigned"
+    ))
+    return next_task
         
-def update_client_workflow(client, next_step):
-    """Update the client's workflow to the next step."""
-    workflow_state, _ = ClientWorkflowState.objects.get_or_create(client=client)
-    workflow_state.current_step = next_step
-    workflow_state.save()
+def update_client_workflow(client, next_step, assigned_to=None):
+    """
+    Move the client's workflow state to next_step owned by assigned_to.
+    entered_at only restarts when the step changes, so a reassignment keeps
+    the time in step. One UPDATE in the common case.
+    """
+    now = timezone.now()
+    states = ClientWorkflowState.objects.filter(client=client)
+    updated = states.filter(current_step=next_step).update(assigned_to=assigned_to, last_updated=now)
+    if not updated:
+        updated = states.update(current_step=next_step, assigned_to=assigned_to, entered_at=now, last_updated=now)
+    if not updated:
+        try:
+            with transaction.atomic():
+                ClientWorkflowState.objects.create(client=client, current_step=next_step, assigned_to=assigned_to, entered_at=now)
+        except IntegrityError:
+            # Created concurrently; take it over
+            states.update(current_step=next_step, assigned_to=assigned_to, entered_at=now, last_updated=now)
+    pipeline.bump_board_version()
 
 def get_team_member_by_role(role_name, task):
-    team = task.client.team
     """Fetch the team member or global member based on role_name."""
-        
-    # Fetch from team members for team-specific roles
-    if role_name in ['marketing_manager', 'content_writer', 'marketing_assistant', 'graphics_designer']:
-        member = task.client.team.memberships.filter(user__role=role_name).first()
-        if member:
-            print(f"Found team-specific member for role '{role_name}' in team '{task.client.team.name}': {member.user}")
-            return member.user
-        else:
-            print(f"Error: Role '{role_name}' not found in team '{task.client.team.name}'")
-            return None
-
-    # Fetch 'account_manager' from the client or team
-    if role_name == 'account_manager':
-        account_manager = task.client.account_manager
-        if account_manager:
-            print(f"Found client-specific account manager: {account_manager}")
-            return account_manager
-        else:
-            # If no client-specific account manager, check the team
-            member = task.client.team.memberships.filter(user__role='account_manager').first()
-            if member:
-                print(f"Found team-specific account manager: {member.user}")
-                return member.user
-            print(f"Error: Account manager not found for client or team.")
-            return None
-
-    # Fetch global roles like 'accountant' or 'marketing_director'
-    if role_name in ['accountant', 'marketing_director']:
-        global_user = CustomUser.objects.filter(role=role_name).first()
-        if global_user:
-            print(f"Found global member for role '{role_name}': {global_user}")
-            return global_user
-        else:
-            print(f"Error: Global role '{role_name}' not found")
-            return None
-
-    print(f"Error: Role '{role_name}' is not recognized.")
-    return None
+    return workflow.resolve_role(role_name, task.client)
 
 def get_next_step_and_user(task):
     """Determine the next step and user in the workflow."""
-    
-    # Workflow mapping with the appropriate roles and next steps
-    workflow_mapping = {
-        'assign_team': ('create_proposal', get_team_member_by_role('marketing_manager', task)),
-        'create_proposal': ('approve_proposal', get_team_member_by_role('account_manager', task)),
-        'approve_proposal': check_proposal_status(task),
-        'schedule_brief_meeting': ('is_meeting_completed', get_team_member_by_role('account_manager', task)),  # New step after schedule_brief_meeting
-        'is_meeting_completed': ('assigned_plan_to_client', get_team_member_by_role('account_manager', task)),  # Proceed to the next step after meeting completion
-        'assigned_plan_to_client': ('create_strategy', get_team_member_by_role('marketing_manager', task)),  
-        'create_strategy': ('content_writing', get_team_member_by_role('content_writer', task)),
-        'content_writing': ('approve_content_by_marketing_manager', get_team_member_by_role('marketing_manager', task)),
-        'approve_content_by_marketing_manager': ('approve_content_by_account_manager', get_team_member_by_role('account_manager', task)),
-        'approve_content_by_account_manager': ('creatives_design', get_team_member_by_role('graphics_designer', task)),
-        'creatives_design': ('approve_creatives_by_marketing_manager', get_team_member_by_role('marketing_manager', task)),
-        'approve_creatives_by_marketing_manager': ('approve_creatives_by_account_manager', get_team_member_by_role('account_manager', task)),
-        'approve_creatives_by_account_manager': ('schedule_onboarding_meeting', get_team_member_by_role('account_manager', task)),
-        'schedule_onboarding_meeting': ('onboarding_meeting', get_team_member_by_role('account_manager', task)),
-        'onboarding_meeting': ('smo_scheduling', get_team_member_by_role('marketing_assistant', task)),
-        'smo_scheduling': ('invoice_submission', get_team_member_by_role('accountant', task)),
-        'invoice_submission': ('invoice_verification', get_team_member_by_role('account_manager', task)),
-        'invoice_verification': ('payment_confirmation', get_team_member_by_role('accountant', task)),
-        'payment_confirmation': ('schedule_meeting', get_team_member_by_role('account_manager', task)),
-        'schedule_meeting': ('brief_meeting', get_team_member_by_role('account_manager', task)),
-        'brief_meeting': ('create_strategy', get_team_member_by_role('marketing_manager', task)),
-        'monthly_reporting': ('invoice_submission', get_team_member_by_role('accountant', task)),
-    } 
+    next_step, next_user = workflow.resolve_transition(task)
+    if next_step and next_user:
+        print(f"Next step: {next_step}, assigned to: {next_user}")
+        return next_step, next_user
 
-    current_step = task.task_type
-
-    while current_step:
-        next_step, next_user = workflow_mapping.get(current_step, (None, None))
-
-        # Special handling for `assigned_plan_to_client`
-        if current_step == 'assigned_plan_to_client' and task.client.client_plans.exists():
-            print(f"Skipping 'assigned_plan_to_client' for client '{task.client.business_name}'.")
-            current_step = 'create_strategy'  # Skip to `create_strategy`
-            
-
-        # Return the next step and user if valid
-        if next_step and next_user:
-            print(f"Next step: {next_step}, assigned to: {next_user}")
-            return next_step, next_user
-
-        # Handle end of workflow
-        print(f"No next step found for task type: {current_step}")
-        return None, None
+    # Handle end of workflow
+    print(f"No next step found for task type: {task.task_type}")
+    return None, None
 
 def check_proposal_status(task):
     """Check the client's proposal approval status and return the next step and user."""
     client = task.client
-    proposal_status = client.proposal_approval_status
-    print(f"Checking proposal status for client '{client.business_name}': {proposal_status}")
-
-    if proposal_status == 'approved':
-        next_user = client.account_manager
-        return 'schedule_brief_meeting', next_user
-    elif proposal_status == 'changes_required':
-        next_user = client.team.memberships.filter(user__role='marketing_manager').first().user
-        return 'create_proposal', next_user
-    elif proposal_status == 'declined':
-        return None, None
-    else:
-        # Default behavior when no status is set
-        next_user = client.team.memberships.filter(user__role='marketing_manager').first().user
-        return 'create_proposal', next_user
+    print(f"Checking proposal status for client '{client.business_name}': {client.proposal_approval_status}")
+    return workflow.resolve_transition(task, workflow.get_proposal_transition(client))
 
 def update_client_status(client, status):
     """Update the client's overall status."""
     client_status, _ = ClientStatus.objects.get_or_create(client=client)
     client_status.status = status
-    client_status.save()
+    client_status.save(update_fields=['status'])
 
 # New 24-01-25
 def send_task_notification(recipient, message, task=None, notification_type="info", sender=None):
     """
     Send a notification to a user and save it to the database.
     Store history for actions performed by the user.
+    The websocket push is queued and sent off the request thread.
     """
     try:
-        # Default values for thread_notify
-        client_id = None
-        client_name = None
-        task_type = None
-
-        if task:
-            client_id = task.client.id
-            client_name = task.client.business_name
-            task_type = task.task_type
-
         print(f"Preparing to send notification to recipient {recipient.id} ({recipient.get_full_name()}).")
-
-        # Save notification to the database with new fields
-        notification = models.Notification.objects.create(
-            recipient=recipient,
-            sender=sender,
-            message=message,
-            notification_type=notification_type,
-            is_read=False,
-            client_id=client_id,
-            client_name=client_name,
-            task_type=task_type,
-        )
-
-        # Save history entry
-        if sender:
-            action_text = f"{sender.get_full_name()} ({sender.role}) performed action: '{message}'"
-        else:
-            action_text = f"{message}"
-
-        history_entry = models.History.objects.create(
-            user=sender if sender else recipient,  # Use sender if available, otherwise recipient
-            action=action_text
-        )
-
-        print(f"History recorded: {action_text}")
-
-        # Send notification via WebSocket
-        channel_layer = get_channel_layer()
-        group_name = f"notifications_{recipient.id}"  # Use the user-specific group name
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {
-                "type": "send_notification",
-                "notification": {
-                    "id": notification.id,
-                    "client_id": client_id,
-                    "client_name": client_name,
-                    "task_type": task_type,
-                    "sender_id": sender.id if sender else None,
-                    "sender_name": sender.get_full_name() if sender else None,
-                    "recipient": recipient.id,
-                    "recipient_full_name": recipient.get_full_name(),
-                    "recipient_role": recipient.role,
-                    "is_read": notification.is_read,
-                    "notification_type": notification_type,
-                    "message": message,
-                },
-            },
-        )
-        print(f"Notification sent successfully to recipient {recipient.id}.")
+        notification = build_notification(recipient, message, task=task, notification_type=notification_type, sender=sender)
+        dispatch_notifications([notification])
+        print(f"Notification queued for recipient {recipient.id}.")
     except Exception as e:
         print(f"Failed to send notification: {e}")
 
+
+def send_bulk_notifications(recipients, message, task=None, notification_type="info", sender=None, group_name=None):
+    """
+    Send the same notification to several users.
+    Notifications and history are written in bulk (see dispatch_notifications);
+    when a team/client group name is given, one websocket event reaches everyone in it.
+    """
+    recipients = [recipient for recipient in recipients if recipient]
+    if not recipients:
+        return []
+    try:
+        print(f"Preparing to send notification to {len(recipients)} recipient(s).")
+        notifications = [
+            build_notification(recipient, message, task=task, notification_type=notification_type, sender=sender)
+            for recipient in recipients
+        ]
+        dispatch_notifications(notifications, group_name=group_name)
+        print(f"Notification queued for {len(recipients)} recipient(s).")
+        return notifications
+    except Exception as e:
+        print(f"Failed to send notifications: {e}")
+        return []
@@ -11,18 +11,14 @@ IsMarketingDirector, IsMarketingManager, IsAccountManager, IsAccountant, IsMarke
 
 from . import models
 from pytz import timezone as pytz_timezone
-from supabase import create_client, Client as SupabaseClient
 from pro_app.storage import save_file_to_supabase
 from account.models import CustomUser
+import json
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.pagination import CursorPagination
 
 
-# set up once at top
-_supabase: SupabaseClient = create_client(
-    settings.SUPABASE_URL,
-    settings.SUPABASE_KEY,
-)
-storage = _supabase.storage.from_(settings.SUPABASE_BUCKET)
-
 # AUTH 
 class CustomTokenObtainPairView(APIView):
     def post(self, request, *args, **kwargs):
@@ -70,34 +66,100 @@ class CookieTokenRefreshView(TokenRefreshView):
         request.data['refresh'] = refresh_token
         return super().post(request, *args, **kwargs)
 
+class HistoryCursorPagination(CursorPagination):
+    """Keyset pagination over the History created_at indexes."""
+    ordering = ('-created_at', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+def _parse_history_bound(value, end_of_day=False):
+    """Accept an ISO datetime or a plain date; dates cover the whole day."""
+    parsed = parse_datetime(value)
+    if parsed is not None:
+        return parsed if parsed.tzinfo else make_aware(parsed)
+    day = parse_date(value)
+    if day is None:
+        raise ValidationError(f"Invalid date '{value}'.")
+    bound = datetime.combine(day, datetime.max.time() if end_of_day else datetime.min.time())
+    return make_aware(bound)
+
+
 class AllHistoriesView(APIView):
     """
-    Fetches all history logs along with user full names.
+    Fetches history logs along with user full names, newest first.
+    Query params:
+      user       - only this user's actions
+      date_from  - ISO date/datetime, inclusive
+      date_to    - ISO date/datetime, inclusive
+      export     - 'ndjson' streams every matching row instead of a page
     Requires authentication.
     """
     permission_classes = [IsAuthenticated]  #Apply authentication check
+    fields = ('id', 'user_id', 'user__first_name', 'user__last_name', 'action', 'created_at')
+    export_batch_size = 2000
 
     def get(self, request):
         try:
-            # Fetch all history records ordered by latest first
-            history_records = models.History.objects.select_related('user').order_by('-created_at')
-
-            # Serialize history data
-            history_data = []
-            for record in history_records:
-                history_data.append({
-                    "id": record.id,
-                    "user_id": record.user.id,
-                    "user_full_name": f"{record.user.first_name} {record.user.last_name}",
-                    "action": record.action,
-                    "created_at": record.created_at.strftime("%Y-%m-%d %H:%M:%S")  # Format timestamp
-                })
-
-            # Return response with all history logs
-            return Response(history_data, status=status.HTTP_200_OK)
+            history_records = self.get_queryset(request)
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            if request.query_params.get('export') == 'ndjson':
+                response = StreamingHttpResponse(self.stream_ndjson(history_records), content_type='application/x-ndjson')
+                response['Content-Disposition'] = 'attachment; filename="histories.ndjson"'
+                return response
+
+            paginator = HistoryCursorPagination()
+            page = paginator.paginate_queryset(history_records.values(*self.fields), request, view=self)
+            return paginator.get_paginated_response([self.serialize(row) for row in page])
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def get_queryset(self, request):
+        history_records = models.History.objects.all()
+        user_id = request.query_params.get('user')
+        if user_id:
+            if not user_id.isdigit():
+                raise ValidationError("Invalid user id.")
+            history_records = history_records.filter(user_id=user_id)
+        date_from = request.query_params.get('date_from')
+        if date_from:
+            history_records = history_records.filter(created_at__gte=_parse_history_bound(date_from))
+        date_to = request.query_params.get('date_to')
+        if date_to:
+            history_records = history_records.filter(created_at__lte=_parse_history_bound(date_to, end_of_day=True))
+        return history_records
+
+    @staticmethod
+    def serialize(row):
+        return {
+            "id": row['id'],
+            "user_id": row['user_id'],
+            "user_full_name": f"{row['user__first_name']} {row['user__last_name']}",
+            "action": row['action'],
+            "created_at": row['created_at'].strftime("%Y-%m-%d %H:%M:%S")  # Format timestamp
+        }
+
+    def stream_ndjson(self, history_records):
+        # Walk the index in keyset batches so only one batch is ever held in memory
+        history_records = history_records.order_by('-created_at', '-id').values(*self.fields)
+        last = None
+        while True:
+            batch = history_records
+            if last is not None:
+                batch = batch.filter(
+                    Q(created_at__lt=last['created_at']) | Q(created_at=last['created_at'], id__lt=last['id'])
+                )
+            rows = list(batch[:self.export_batch_size])
+            for row in rows:
+                yield json.dumps(self.serialize(row)) + "\n"
+            if len(rows) < self.export_batch_size:
+                return
+            last = rows[-1]
        
 
 
@@ -0,0 +1,90 @@
+from .assignment import pick_team_member
+from .roster import get_global_user
+
+# Roles resolved from the client's team, from the client itself or agency-wide
+TEAM_ROLES = ('marketing_manager', 'content_writer', 'marketing_assistant', 'graphics_designer')
+GLOBAL_ROLES = ('accountant', 'marketing_director')
+
+# Static workflow table: current step -> (next step, role that owns the next step).
+# Only the role of the transition actually taken is resolved.
+WORKFLOW_TRANSITIONS = {
+    'assign_team': ('create_proposal', 'marketing_manager'),
+    'create_proposal': ('approve_proposal', 'account_manager'),
+    'schedule_brief_meeting': ('is_meeting_completed', 'account_manager'),
+    'is_meeting_completed': ('assigned_plan_to_client', 'account_manager'),
+    'assigned_plan_to_client': ('create_strategy', 'marketing_manager'),
+    'create_strategy': ('content_writing', 'content_writer'),
+    'content_writing': ('approve_content_by_marketing_manager', 'marketing_manager'),
+    'approve_content_by_marketing_manager': ('approve_content_by_account_manager', 'account_manager'),
+    'approve_content_by_account_manager': ('creatives_design', 'graphics_designer'),
+    'creatives_design': ('approve_creatives_by_marketing_manager', 'marketing_manager'),
+    'approve_creatives_by_marketing_manager': ('approve_creatives_by_account_manager', 'account_manager'),
+    'approve_creatives_by_account_manager': ('schedule_onboarding_meeting', 'account_manager'),
+    'schedule_onboarding_meeting': ('onboarding_meeting', 'account_manager'),
+    'onboarding_meeting': ('smo_scheduling', 'marketing_assistant'),
+    'smo_scheduling': ('invoice_submission', 'accountant'),
+    'invoice_submission': ('invoice_verification', 'account_manager'),
+    'invoice_verification': ('payment_confirmation', 'accountant'),
+    'payment_confirmation': ('schedule_meeting', 'account_manager'),
+    'schedule_meeting': ('brief_meeting', 'account_manager'),
+    'brief_meeting': ('create_strategy', 'marketing_manager'),
+    'monthly_reporting': ('invoice_submission', 'accountant'),
+}
+
+# 'approve_proposal' branches on the client's proposal approval status
+PROPOSAL_TRANSITIONS = {
+    'approved': ('schedule_brief_meeting', 'account_manager'),
+    'changes_required': ('create_proposal', 'marketing_manager'),
+    'declined': (None, None),
+}
+DEFAULT_PROPOSAL_TRANSITION = ('create_proposal', 'marketing_manager')
+
+
+def resolve_role(role_name, client):
+    """Fetch the team member, client account manager or global user for a role."""
+    if role_name in TEAM_ROLES:
+        user = pick_team_member(client, role_name)
+        if not user:
+            print(f"Error: Role '{role_name}' not found in team '{client.team.name}'")
+        return user
+
+    if role_name == 'account_manager':
+        # Prefer the client's own account manager, then fall back to the team
+        if client.account_manager_id:
+            return client.account_manager
+        user = pick_team_member(client, 'account_manager')
+        if not user:
+            print("Error: Account manager not found for client or team.")
+        return user
+
+    if role_name in GLOBAL_ROLES:
+        user = get_global_user(role_name)
+        if not user:
+            print(f"Error: Global role '{role_name}' not found")
+        return user
+
+    print(f"Error: Role '{role_name}' is not recognized.")
+    return None
+
+
+def get_proposal_transition(client):
+    """Return the (next_step, role) pair following a proposal review."""
+    return PROPOSAL_TRANSITIONS.get(client.proposal_approval_status, DEFAULT_PROPOSAL_TRANSITION)
+
+
+def get_transition(task):
+    """Return the (next_step, role) pair for the task's current step."""
+    if task.task_type == 'approve_proposal':
+        return get_proposal_transition(task.client)
+    return WORKFLOW_TRANSITIONS.get(task.task_type, (None, None))
+
+
+def resolve_transition(task, transition=None):
+    """Return the next step and the user who should own it, or (None, None)."""
+    next_step, role_name = transition or get_transition(task)
+    if not next_step:
+        return None, None
+    next_user = resolve_role(role_name, task.client)
+    if not next_user:
+        return None, None
+    return next_step, next_user
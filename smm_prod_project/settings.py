@@ -27,6 +27,11 @@ MEDIA_URL = f'{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/'
 
 DEFAULT_FILE_STORAGE = 'pro_app.storage_backends.SupabaseStorage'
 
+# Object storage backend used by pro_app.storage: 'supabase' or 'local' (offline runs/benchmarks)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'supabase')
+LOCAL_STORAGE_ROOT = os.path.join(BASE_DIR, 'media')
+LOCAL_STORAGE_URL = '/media/'
+
 SUPABASE_STORAGE_OPTIONS = {
     'bucket': SUPABASE_BUCKET,
     'root_path': '',  # Ensure files are uploaded directly to bucket root
@@ -95,6 +100,14 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared cache (team rosters, global role lookups); separate Redis db from the channel layer
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    },
+}
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -1,6 +1,21 @@
 from django.contrib import admin
-from .models import Task, CustomTask
+from .models import Task, CustomTask, TaskCycleRollup, TaskTransition
 
 # Register your models here.
 admin.site.register(Task)
-admin.site.register(CustomTask)
\ No newline at end of file
+admin.site.register(CustomTask)
+
+@admin.register(TaskTransition)
+class TaskTransitionAdmin(admin.ModelAdmin):
+    # The log is append-only
+    list_display = ('created_at', 'client', 'task_type', 'event', 'assigned_to', 'time_in_step')
+    list_filter = ('event', 'task_type')
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(TaskCycleRollup)
@@ -0,0 +1,74 @@
+import math
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TaskCycleRollup, TaskTransition
+
+# Reporting reads TaskCycleRollup only. The rollup command rebuilds whole
+# days from the transition log, so re-running it for a day is harmless.
+
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of an already sorted, non-empty list."""
+    position = (len(sorted_values) - 1) * fraction
+    lower, upper = math.floor(position), math.ceil(position)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def build_rollups(day):
+    """Unsaved rollup rows for the completions logged on day, from a single read of the log."""
+    start, end = _day_bounds(day)
+    completions = TaskTransition.objects.filter(
+        event='completed', created_at__gte=start, created_at__lt=end, time_in_step__isnull=False,
+    ).values_list('task_type', 'team_id', 'assigned_to_id', 'time_in_step')
+
+    groups = defaultdict(list)
+    for task_type, team_id, user_id, seconds in completions:
+        groups[('step', task_type, None, None)].append(seconds)
+        if team_id:
+            groups[('team', task_type, team_id, None)].append(seconds)
+        if user_id:
+            groups[('user', task_type, None, user_id)].append(seconds)
+
+    rollups = []
+    for (scope, task_type, team_id, user_id), seconds in groups.items():
+        seconds.sort()
+        rollups.append(TaskCycleRollup(
+            day=day, scope=scope, task_type=task_type, team_id=team_id, user_id=user_id,
+            count=len(seconds),
+            median_seconds=round(percentile(seconds, 0.5)),
+            p90_seconds=round(percentile(seconds, 0.9)),
+        ))
+    return rollups
+
+
+def rollup_day(day):
+    """Replace day's rollups with freshly computed ones; returns the number of rows written."""
+    rollups = build_rollups(day)
+    with transaction.atomic():
+        TaskCycleRollup.objects.filter(day=day).delete()
+        TaskCycleRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
+
+
+def cycle_time_rows(scope, start, end, task_type=None, team_id=None, user_id=None):
+    """Rollup rows for scope between start and end (inclusive), oldest day first."""
+    rollups = TaskCycleRollup.objects.filter(scope=scope, day__gte=start, day__lte=end)
+    if task_type:
+        rollups = rollups.filter(task_type=task_type)
+    if team_id:
+        rollups = rollups.filter(team_id=team_id)
+    if user_id:
+        rollups = rollups.filter(user_id=user_id)
+    return list(rollups.order_by('day', 'task_type', 'team_id', 'user_id').values(
+        'day', 'task_type', 'team_id', 'team__name', 'user_id', 'user__username',
+        'count', 'median_seconds', 'p90_seconds',
+    ))
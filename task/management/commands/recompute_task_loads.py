@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from task import workload
+
+
+class Command(BaseCommand):
+    help = "Recount each user's open task counters used for least-loaded assignment and repair any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Report drift without writing anything.")
+
+    def handle(self, *args, **options):
+        fix = not options['verify']
+        drift = workload.recompute(fix=fix)
+        for user_id, fields in sorted(drift.items()):
+            details = ", ".join(f"{field} {stored} -> {actual}" for field, (stored, actual) in fields.items())
+            self.stdout.write(f"User {user_id}: {details}")
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("All task load counters are up to date."))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f"Repaired counters for {len(drift)} user(s)."))
+        else:
+            raise CommandError(f"{len(drift)} user(s) have drifted counters.")
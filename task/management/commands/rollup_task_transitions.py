@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from task import analytics
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily task cycle-time rollups from the transition log (run nightly, off hours)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Last day to roll up, e.g. 2025-07-31 (default: yesterday).")
+        parser.add_argument('--days', type=int, default=1, help="Number of days ending with --date to rebuild.")
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                last_day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Unrecognised date '{options['date']}'.")
+        else:
+            last_day = timezone.localdate() - timedelta(days=1)
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1.")
+
+        for offset in range(options['days'] - 1, -1, -1):
+            day = last_day - timedelta(days=offset)
+            written = analytics.rollup_day(day)
+            self.stdout.write(f"{day}: {written} rollup row(s)")
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {options['days']} day(s) ending {last_day}."))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.18 on 2026-10-17 17:58
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_tasks(apps, schema_editor):
+    # Keep one task per (client, task_type): the open one if any, else the most recently updated
+    Task = apps.get_model('task', 'Task')
+    duplicates = (
+        Task.objects.values('client_id', 'task_type')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for group in duplicates:
+        rows = list(
+            Task.objects.filter(client_id=group['client_id'], task_type=group['task_type'])
+            .order_by('is_completed', '-updated_at', '-id')
+            .values_list('id', flat=True)
+        )
+        Task.objects.filter(id__in=rows[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_tasks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(fields=('client', 'task_type'), name='unique_client_task_type'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('client', '0002_workflow_state_assignee'),
+        ('task', '0002_unique_client_task_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_type', models.CharField(choices=[('assign_team', 'Assign Team to Client'), ('create_proposal', 'Create Proposal'), ('approve_proposal', 'Approve Proposal'), ('schedule_brief_meeting', 'Schedule Brief Meeting'), ('create_strategy', 'Create Strategy'), ('content_writing', 'Content Writing'), ('approve_content_by_marketing_manager', 'Approve Content by Marketing Manager'), ('approve_content_by_account_manager', 'Approve Content by Account Manager'), ('creatives_design', 'Creatives Designing'), ('approve_creatives_by_marketing_manager', 'Approve Creatives by Marketing Manager'), ('approve_creatives_by_account_manager', 'Approve Creatives by Account Manager'), ('schedule_onboarding_meeting', 'Schedule Onboarding Meeting'), ('onboarding_meeting', 'Onboarding Meeting'), ('smo_scheduling', 'SMO & Scheduling'), ('invoice_submission', 'Invoice Submission'), ('payment_confirmation', 'Payment Confirmation'), ('monthly_report', 'Monthly Reporting')], max_length=50)),
+                ('event', models.CharField(choices=[('assigned', 'Assigned'), ('completed', 'Completed')], max_length=20)),
+                ('time_in_step', models.PositiveIntegerField(blank=True, help_text='Seconds from assignment to completion (completed events only).', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_transitions', to=settings.AUTH_USER_MODEL)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_transitions', to='client.clients')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transitions', to='task.task')),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_transitions', to='team.team')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'created_at'], name='transition_event_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskCycleRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('scope', models.CharField(choices=[('step', 'Step'), ('team', 'Team'), ('user', 'User')], max_length=10)),
+                ('task_type', models.CharField(choices=[('assign_team', 'Assign Team to Client'), ('create_proposal', 'Create Proposal'), ('approve_proposal', 'Approve Proposal'), ('schedule_brief_meeting', 'Schedule Brief Meeting'), ('create_strategy', 'Create Strategy'), ('content_writing', 'Content Writing'), ('approve_content_by_marketing_manager', 'Approve Content by Marketing Manager'), ('approve_content_by_account_manager', 'Approve Content by Account Manager'), ('creatives_design', 'Creatives Designing'), ('approve_creatives_by_marketing_manager', 'Approve Creatives by Marketing Manager'), ('approve_creatives_by_account_manager', 'Approve Creatives by Account Manager'), ('schedule_onboarding_meeting', 'Schedule Onboarding Meeting'), ('onboarding_meeting', 'Onboarding Meeting'), ('smo_scheduling', 'SMO & Scheduling'), ('invoice_submission', 'Invoice Submission'), ('payment_confirmation', 'Payment Confirmation'), ('monthly_report', 'Monthly Reporting')], max_length=50)),
+                ('count', models.PositiveIntegerField()),
+                ('median_seconds', models.PositiveIntegerField()),
+                ('p90_seconds', models.PositiveIntegerField()),
+                ('team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='team.team')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'day'], name='rollup_scope_day_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:07
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_task_loads(apps, schema_editor):
+    Task = apps.get_model('task', 'Task')
+    CustomTask = apps.get_model('task', 'CustomTask')
+    UserTaskLoad = apps.get_model('task', 'UserTaskLoad')
+    loads = {}
+    for user_id, count in Task.objects.filter(is_completed=False).values_list('assigned_to_id').annotate(n=Count('id')):
+        loads.setdefault(user_id, UserTaskLoad(user_id=user_id)).open_tasks = count
+    for user_id, count in CustomTask.objects.filter(task_status=False).values_list('assign_to_id_id').annotate(n=Count('id')):
+        loads.setdefault(user_id, UserTaskLoad(user_id=user_id)).open_custom_tasks = count
+    UserTaskLoad.objects.bulk_create(loads.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0001_initial'),
+        ('task', '0003_task_transitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskLoad',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='task_load', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('open_tasks', models.PositiveIntegerField(default=0)),
+                ('open_custom_tasks', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_task_loads, migrations.RunPython.noop),
+    ]
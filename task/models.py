@@ -32,6 +32,12 @@ class Task(models.Model):
 
     def __str__(self):
         return f"{self.task_type} for {self.client.business_name} - Assigned to: {self.assigned_to.username}"
+
+    class Meta:
+        constraints = [
+            # One row per workflow step per client; pro_app.utils.create_task upserts against it
+            models.UniqueConstraint(fields=['client', 'task_type'], name='unique_client_task_type'),
+        ]
     
 
 class CustomTask(models.Model):
@@ -55,3 +61,70 @@ class CustomTask(models.Model):
         return f"{self.task_name} - Assigned to {self.assign_to_id.username}"
 
 
+
+
+class TaskTransition(models.Model):
+    # Append-only log of workflow task events, written by pro_app.utils.
+    # Task rows are reused in place, so this is the only record of timings.
+    EVENT_CHOICES = [
+        ('assigned', 'Assigned'),
+        ('completed', 'Completed'),
+    ]
+
+    task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True, related_name='transitions')
+    client = models.ForeignKey('client.Clients', on_delete=models.CASCADE, related_name='task_transitions')
+    team = models.ForeignKey('team.Team', on_delete=models.SET_NULL, null=True, blank=True, related_name='task_transitions')
+    task_type = models.CharField(max_length=50, choices=Task.TASK_TYPE_CHOICES)
+    event = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='task_transitions')
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    time_in_step = models.PositiveIntegerField(null=True, blank=True, help_text="Seconds from assignment to completion (completed events only).")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.task_type} {self.event} for client {self.client_id} at {self.created_at}"
+
+    class Meta:
+        indexes = [
+            # The daily rollup reads one day's completions
+            models.Index(fields=['event', 'created_at'], name='transition_event_created_idx'),
+        ]
+
+
+class TaskCycleRollup(models.Model):
+    # Daily time-in-step statistics per step, per step and team, and per step
+    # and user, built from TaskTransition by `manage.py rollup_task_transitions`.
+    SCOPE_CHOICES = [
+        ('step', 'Step'),
+        ('team', 'Team'),
+        ('user', 'User'),
+    ]
+
+    day = models.DateField()
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    task_type = models.CharField(max_length=50, choices=Task.TASK_TYPE_CHOICES)
+    team = models.ForeignKey('team.Team', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    count = models.PositiveIntegerField()
+    median_seconds = models.PositiveIntegerField()
+    p90_seconds = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.day} {self.scope} {self.task_type}: {self.count} completed"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['scope', 'day'], name='rollup_scope_day_idx'),
+        ]
+
+
+class UserTaskLoad(models.Model):
+    # Open workflow and custom task counts per user, maintained by task.workload
+    # as tasks are assigned, completed and deleted, so picking the least-loaded
+    # member never counts Task rows. `manage.py recompute_task_loads` repairs drift.
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='task_load')
+    open_tasks = models.PositiveIntegerField(default=0)
+    open_custom_tasks = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.open_tasks} open tasks, {self.open_custom_tasks} open custom tasks"
@@ -1,3 +1,149 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from account.models import CustomUser
+from client.models import Clients
+from pro_app.utils import create_task, mark_task_as_completed
+from team.models import Team, TeamMembership
+from . import workload
+from .models import Task, TaskTransition, UserTaskLoad
+
+
+def make_user(role, n=''):
+    return CustomUser.objects.create(email=f'{role}{n}@example.com', username=f'{role}{n}', role=role)
+
+
+class WorkflowTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.director = make_user('marketing_director')
+        self.account_manager = make_user('account_manager')
+        self.team = Team.objects.create(name='Team', created_by=self.director)
+        self.members = {}
+        for role in ('marketing_manager', 'content_writer'):
+            self.members[role] = make_user(role)
+            TeamMembership.objects.create(team=self.team, user=self.members[role])
+        self.client_obj = Clients.objects.create(
+            team=self.team, account_manager=self.account_manager, business_name='Client',
+            contact_person='Contact', business_address='Address', business_email_address='client@example.com',
+        )
+
+
+class CreateTaskTests(WorkflowTestMixin, TestCase):
+    def test_repeated_create_task_keeps_one_row(self):
+        writer = self.members['content_writer']
+        first = create_task(self.client_obj, 'content_writing', writer)
+        Task.objects.filter(pk=first.pk).update(is_completed=True)
+        second = create_task(self.client_obj, 'content_writing', writer)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.filter(client=self.client_obj, task_type='content_writing').count(), 1)
+        self.assertFalse(second.is_completed)
+
+    def test_create_task_reassigns_the_existing_row(self):
+        create_task(self.client_obj, 'content_writing', self.members['content_writer'])
+        task = create_task(self.client_obj, 'content_writing', self.members['marketing_manager'])
+
+        self.assertEqual(Task.objects.filter(client=self.client_obj, task_type='content_writing').count(), 1)
+        self.assertEqual(task.assigned_to, self.members['marketing_manager'])
+
+
+class CompleteTaskRollbackTests(WorkflowTestMixin, TestCase):
+    def test_failed_next_step_upsert_rolls_back_the_completion(self):
+        task = create_task(self.client_obj, 'create_strategy', self.members['marketing_manager'])
+
+        with mock.patch('pro_app.utils._upsert_task', side_effect=IntegrityError('upsert failed')):
+            with self.assertRaises(IntegrityError):
+                mark_task_as_completed(task, current_user=self.members['marketing_manager'])
+
+        task.refresh_from_db()
+        self.assertFalse(task.is_completed)
+        self.assertFalse(Task.objects.filter(client=self.client_obj, task_type='content_writing').exists())
+        self.assertFalse(TaskTransition.objects.filter(task=task, event='completed').exists())
+
+
+class TaskLoadCounterTests(WorkflowTestMixin, TestCase):
+    def stored_loads(self):
+        return {
+            row['user_id']: {field: row[field] for field in workload.LOAD_FIELDS}
+            for row in UserTaskLoad.objects.values('user_id', *workload.LOAD_FIELDS)
+            if any(row[field] for field in workload.LOAD_FIELDS)
+        }
+
+    def test_counters_follow_assignment_and_completion(self):
+        writer, manager = self.members['content_writer'], self.members['marketing_manager']
+        task = create_task(self.client_obj, 'create_strategy', manager)
+        create_task(self.client_obj, 'create_strategy', manager)
+        create_task(self.client_obj, 'content_writing', writer)
+        create_task(self.client_obj, 'content_writing', manager)
+        self.assertEqual(self.stored_loads(), workload.compute())
+
+        mark_task_as_completed(task, current_user=manager)
+        self.assertEqual(self.stored_loads(), workload.compute())
+        self.assertEqual(workload.recompute(fix=False), {})
+
+    def test_verify_raises_command_error_on_drift(self):
+        create_task(self.client_obj, 'content_writing', self.members['content_writer'])
+        UserTaskLoad.objects.update(open_tasks=5)
+
+        with self.assertRaises(CommandError):
+            call_command('recompute_task_loads', '--verify', stdout=io.StringIO())
+        call_command('recompute_task_loads', stdout=io.StringIO())
+        self.assertEqual(workload.recompute(fix=False), {})
+
+
+class RemoveDuplicateTasksMigrationTests(TransactionTestCase):
+    migrate_from = [('task', '0001_initial')]
+    migrate_to = [('task', '0002_unique_client_task_type')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        User = apps.get_model('account', 'CustomUser')
+        Client = apps.get_model('client', 'Clients')
+        self.Task = apps.get_model('task', 'Task')
+
+        manager = User.objects.create(email='am@example.com', username='am', role='account_manager')
+        writer = User.objects.create(email='cw@example.com', username='cw', role='content_writer')
+        client = Client.objects.create(
+            account_manager=manager, business_name='Client', contact_person='Contact',
+            business_address='Address', business_email_address='client@example.com',
+        )
+        now = timezone.now()
+
+        def task(task_type, is_completed, age_hours):
+            row = self.Task.objects.create(client=client, assigned_to=writer, task_type=task_type, is_completed=is_completed)
+            self.Task.objects.filter(pk=row.pk).update(updated_at=now - timedelta(hours=age_hours))
+            return row.pk
+
+        # An open row wins over newer completed ones
+        task('content_writing', True, 1)
+        self.open_id = task('content_writing', False, 5)
+        task('content_writing', True, 0)
+        # With every row completed the newest wins
+        task('create_strategy', True, 3)
+        self.newest_id = task('create_strategy', True, 1)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_collapse_to_the_open_or_newest_row(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.migrate_to)
+        Task = executor.loader.project_state(self.migrate_to).apps.get_model('task', 'Task')
+
+        self.assertEqual(
+            sorted(Task.objects.values_list('task_type', 'id')),
+            [('content_writing', self.open_id), ('create_strategy', self.newest_id)],
+        )
@@ -17,6 +17,10 @@ urlpatterns = [
     path('<int:task_id>/complete', views.CompleteTaskView.as_view(), name='complete-task'),  
 
 
+    # Daily time-in-step statistics per step, team or user (marketing director)
+    path('analytics/cycle-time', views.TaskCycleTimeView.as_view(), name='task-cycle-time'),
+
+
     # ======================================== MY CUSTOM TASKS ===============================================
 
     # ✅ Retrieves all custom tasks assigned to the authenticated user
@@ -1,6 +1,5 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import os
-import tempfile
 from arrow import now
 from django.shortcuts import render
 from rest_framework.permissions import IsAuthenticated
@@ -8,12 +7,18 @@ from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from rest_framework.response import Response
 from rest_framework import status, generics
-from pro_app.utils import check_proposal_status, create_task, get_next_step_and_user, mark_task_as_completed, send_task_notification, update_client_status
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from pro_app.utils import TaskAlreadyCompleted, check_proposal_status, create_task, get_next_step_and_user, mark_task_as_completed, send_task_notification, update_client_status
 from pro_app import storage
+from pro_app.permissions import IsMarketingDirector
 from client.models import ClientInvoices
 from calender.models import ClientCalendar, ClientCalendarDate 
+from calender import completeness
 from meeting.models import Meeting
-from .models import Task, CustomTask
+from .models import Task, CustomTask, TaskCycleRollup
+from . import analytics
 from .serializers import CustomTaskSerializer, MyTaskSerializer, TaskSerializer
 from storage3.exceptions import StorageApiError
 
@@ -42,11 +47,17 @@ class BaseTaskView(APIView):
 
 
 class CompleteTaskView(BaseTaskView):
-    # Handle task completion with various validations
+    # Handle task completion with various validations.
+    # Checks only validate and stage their writes; the writes, the completion
+    # and the client status change commit together, and notifications go out
+    # after the commit, so a failed check leaves nothing behind.
     
     def post(self, request, task_id):
         try:
-            task = get_object_or_404(Task, id=task_id)
+            task = get_object_or_404(
+                Task.objects.select_related('client__team', 'client__account_manager', 'assigned_to'),
+                id=task_id,
+            )
             
             # Validate permissions and preconditions
             self._validate_task_ownership(task, request.user)
@@ -61,20 +72,27 @@ class CompleteTaskView(BaseTaskView):
             meeting_id = request.data.get("meeting_id")
             invoice_id = request.data.get("invoice_id")
             
-            # Perform task-specific checks
-            check_result = self._perform_task_checks(request, task, calendar_id, meeting_id, invoice_id)
-            if not check_result["success"]:
-                return Response(check_result, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Mark task as completed
-            mark_task_as_completed(task, current_user=request.user)
-            
-            # Handle client status updates if needed
-            if task.task_type == 'payment_confirmation':
-                update_client_status(task.client, 'Completed')
+            with transaction.atomic():
+                # Perform task-specific checks
+                check_result = self._perform_task_checks(request, task, calendar_id, meeting_id, invoice_id)
+                if not check_result["success"]:
+                    transaction.set_rollback(True)
+                    return Response(check_result, status=status.HTTP_400_BAD_REQUEST)
+                
+                # Apply the staged writes, then mark the task as completed exactly once
+                for instance, fields in check_result.get("writes", []):
+                    instance.save(update_fields=fields)
+                mark_task_as_completed(task, current_user=request.user)
+                
+                # Handle client status updates if needed
+                if task.task_type == 'payment_confirmation':
+                    update_client_status(task.client, 'Completed')
             
             return Response({"message": "Task completed successfully."}, status=status.HTTP_200_OK)
             
+        except TaskAlreadyCompleted as e:
+            # A concurrent request completed it first; its writes stand and ours were rolled back
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
         except PermissionError as e:
             return Response({"error": str(e)}, status=status.HTTP_403_FORBIDDEN)
         except ValueError as e:
@@ -82,35 +100,47 @@ class CompleteTaskView(BaseTaskView):
         except Exception as e:
             return Response({"error": f"An error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # Calendar flag recording each manager's approval
+    APPROVAL_FIELDS = {
+        ('content', 'marketing'): 'mm_content_completed',
+        ('content', 'account'): 'acc_content_completed',
+        ('creatives', 'marketing'): 'mm_creative_completed',
+        ('creatives', 'account'): 'acc_creative_completed',
+    }
+
     def _perform_task_checks(self, request, task, calendar_id=None, meeting_id=None, invoice_id=None):
-        # Perform task-specific checks before marking as completed
+        # Perform task-specific checks before marking as completed.
+        # A passing check may return "writes": [(instance, update_fields), ...]
         task_type = task.task_type
-        client = task.client
         
         # Mapping of task types to their respective check methods
         task_checkers = {
             'create_proposal': lambda: self._check_proposal_uploaded(task),
             'approve_proposal': lambda: self._handle_approval_task(task, request, 'proposal'),
-            'schedule_brief_meeting': lambda: self._check_meeting_created(task, request, meeting_id, required=1),
-            'schedule_onboarding_meeting': lambda: self._check_meeting_created(task, request, meeting_id, required=2),
+            'schedule_brief_meeting': lambda: self._check_meeting_created(task, meeting_id, required=1),
+            'schedule_onboarding_meeting': lambda: self._check_meeting_created(task, meeting_id, required=2),
             'assigned_plan_to_client': lambda: self._check_client_plan_assigned(task),
-            'create_strategy': lambda: self._check_calendar_resources(task, request, calendar_id),
-            'content_writing': lambda: self._check_content_availability(task, request, calendar_id),
-            'creatives_design': lambda: self._check_creatives_design_task(task, request, calendar_id),
+            'create_strategy': lambda: self._check_calendar_resources(task, calendar_id),
+            'content_writing': lambda: self._check_content_availability(task, calendar_id),
+            'creatives_design': lambda: self._check_creatives_design_task(task, calendar_id),
             'approve_content_by_marketing_manager': lambda: self._handle_approval_task(task, request, 'content', 'marketing'),
             'approve_content_by_account_manager': lambda: self._handle_approval_task(task, request, 'content', 'account'),
             'approve_creatives_by_marketing_manager': lambda: self._handle_approval_task(task, request, 'creatives', 'marketing'),
             'approve_creatives_by_account_manager': lambda: self._handle_approval_task(task, request, 'creatives', 'account'),
-            'invoice_submission': lambda: self._check_invoice_submission(task, request, invoice_id),
-            'invoice_verification': lambda: self._check_invoice_status(task, request, invoice_id, 'unpaid'),
-            'payment_confirmation': lambda: self._check_invoice_status(task, request, invoice_id, 'paid'),
-            'smo_scheduling': lambda: self._update_calendar_flag(task, request, calendar_id, 'smo_completed'),
+            'invoice_submission': lambda: self._check_invoice_submission(task, invoice_id),
+            'invoice_verification': lambda: self._check_invoice_status(task, invoice_id, 'unpaid'),
+            'payment_confirmation': lambda: self._check_invoice_status(task, invoice_id, 'paid'),
+            'smo_scheduling': lambda: self._update_calendar_flag(task, calendar_id, 'smo_completed'),
         }
         
         if task_type in task_checkers:
             return task_checkers[task_type]()
         return {"success": True}
 
+    def _get_calendar(self, task, calendar_id):
+        # Lock the calendar row so its flags are read and written in the same transaction
+        return ClientCalendar.objects.select_for_update().get(client_id=task.client_id, id=calendar_id)
+
     def _check_proposal_uploaded(self, task):
         # Check if proposal is uploaded for create_proposal task
         if not task.client.proposal_pdf:
@@ -129,12 +159,11 @@ class CompleteTaskView(BaseTaskView):
         if not status:
             return {"success": False, "message": "The 'status' field is required."}
         
-        client = task.client
         calendar_id = request.data.get("calendar_id")
         
         try:
             if status == 'approve':
-                return self._handle_approve_status(task, request, approval_type, manager_type, calendar_id)
+                return self._handle_approve_status(task, approval_type, manager_type, calendar_id)
             elif status == 'changes_required':
                 return self._handle_changes_required(task, request, approval_type, manager_type, calendar_id)
             elif status == 'declined':
@@ -144,44 +173,35 @@ class CompleteTaskView(BaseTaskView):
         except Exception as e:
             return {"success": False, "message": str(e)}
 
-    def _handle_approve_status(self, task, request, approval_type, manager_type, calendar_id):
-        # Handle approval status for various task types
+    def _handle_approve_status(self, task, approval_type, manager_type, calendar_id):
+        # Stage the approval; completing the task picks the next step (for proposals from the new status)
         client = task.client
         
         if approval_type == 'proposal':
             client.proposal_approval_status = 'approved'
-            client.save()
-            next_step, next_user = check_proposal_status(task)
+            writes = [(client, ['proposal_approval_status'])]
         else:
-            calendar = ClientCalendar.objects.get(client=client, id=calendar_id)
-            field_name = f"{manager_type}_{approval_type}_completed" if manager_type else f"{approval_type}_completed"
-            setattr(calendar, field_name, 'approved')
-            calendar.save()
-            
+            calendar = self._get_calendar(task, calendar_id)
             if not self._check_all_approved(calendar, f"{approval_type}_approval"):
                 return {"success": False, "message": f"Not all {approval_type} fields are approved."}
             
-            next_step, next_user = get_next_step_and_user(task)
-        
-        mark_task_as_completed(task, current_user=request.user)
-        if next_step and next_user:
-            create_task(client, next_step, next_user)
+            field_name = self.APPROVAL_FIELDS[(approval_type, manager_type)]
+            setattr(calendar, field_name, 'approved')
+            writes = [(calendar, [field_name])]
         
-        return {"success": True, "message": f"{approval_type.capitalize()} approved successfully."}
+        return {"success": True, "message": f"{approval_type.capitalize()} approved successfully.", "writes": writes}
 
     def _check_all_approved(self, calendar, approval_field):
-        # Check if all dates in calendar have the specified approval field set
-        dates = ClientCalendarDate.objects.filter(calendar=calendar)
-        return all(
-            getattr(date.internal_status, approval_field, False) if hasattr(date, 'internal_status') 
-            else date.internal_status.get(approval_field, False)
-            for date in dates
-        )
+        # The maintained pending counter answers this without touching the dates
+        pending = getattr(calendar, f"pending_internal_{approval_field.replace('_approval', '')}", None)
+        if pending is None:
+            return completeness.all_approved(calendar, approval_field)
+        return pending == 0
 
-    def _check_meeting_created(self, task, request, meeting_id, required=1):
+    def _check_meeting_created(self, task, meeting_id, required=1):
         # Generic meeting checker for different meeting types
         try:
-            meeting = Meeting.objects.get(id=meeting_id, client=task.client)
+            meeting = Meeting.objects.get(id=meeting_id, client_id=task.client_id)
             current_date = datetime.now().date()
             
             # Check if meeting is in current or next month
@@ -199,67 +219,54 @@ class CompleteTaskView(BaseTaskView):
             
             # For onboarding meetings, check if required number of meetings exist
             if required > 1:
-                past_meetings = Meeting.objects.filter(client=task.client, date__lt=current_date).exists()
-                required_meetings = 2 if not past_meetings else 1
-                
-                current_month_count = Meeting.objects.filter(
-                    client=task.client,
-                    date__year=current_date.year,
-                    date__month=current_date.month
-                ).count()
-                
-                next_month_count = Meeting.objects.filter(
-                    client=task.client,
-                    date__year=next_month_date.year,
-                    date__month=next_month_date.month
-                ).count()
+                meetings = Meeting.objects.filter(client_id=task.client_id)
+                counts = meetings.aggregate(
+                    past=Count('id', filter=Q(date__lt=current_date)),
+                    upcoming=Count('id', filter=(
+                        Q(date__year=current_date.year, date__month=current_date.month)
+                        | Q(date__year=next_month_date.year, date__month=next_month_date.month)
+                    )),
+                )
+                required_meetings = 2 if not counts['past'] else 1
                 
-                if (current_month_count + next_month_count) < required_meetings:
+                if counts['upcoming'] < required_meetings:
                     return {
                         "success": False,
                         "message": f"Client requires {required_meetings} meetings in current/next month."
                     }
             
-            mark_task_as_completed(task, current_user=request.user)
             return {"success": True, "message": "Meeting verified successfully."}
             
         except Meeting.DoesNotExist:
             return {"success": False, "message": "No meeting found with the provided ID."}
 
-    def _check_calendar_resources(self, task, request, calendar_id):
+    def _check_calendar_resources(self, task, calendar_id):
         # Check if all strategy resources are available in the calendar
         try:
-            calendar = ClientCalendar.objects.get(client=task.client, id=calendar_id)
-            dates = ClientCalendarDate.objects.filter(calendar=calendar)
-            
-            missing_dates = [date.date for date in dates if not date.resource or not date.resource.strip()]
+            calendar = self._get_calendar(task, calendar_id)
+            # Counters say whether anything is missing; the dates are only listed for the message
+            missing_dates = completeness.missing_resource_dates(calendar) if calendar.dates_missing_resource else []
             if missing_dates:
                 return {
                     "success": False,
                     "message": f"Strategy resources missing for dates: {missing_dates}"
                 }
             
+            writes = []
             if not calendar.strategy_completed:
                 calendar.strategy_completed = True
-                calendar.save()
+                writes.append((calendar, ['strategy_completed']))
             
-            mark_task_as_completed(task, current_user=request.user)
-            return {"success": True, "message": "Strategy resources verified."}
+            return {"success": True, "message": "Strategy resources verified.", "writes": writes}
             
         except ClientCalendar.DoesNotExist:
             return {"success": False, "message": "No calendar found for the current month."}
 
-    def _check_content_availability(self, task, request, calendar_id):
+    def _check_content_availability(self, task, calendar_id):
         # Check if all required content fields are present
         try:
-            calendar = ClientCalendar.objects.get(client=task.client, id=calendar_id)
-            dates = ClientCalendarDate.objects.filter(calendar=calendar)
-            
-            required_fields = ['tagline', 'caption', 'hashtags', 'e_hooks', 'creatives_text']
-            missing_dates = [
-                date.date for date in dates
-                if any(not getattr(date, field) for field in required_fields)
-            ]
+            calendar = ClientCalendar.objects.get(client_id=task.client_id, id=calendar_id)
+            missing_dates = completeness.missing_content_dates(calendar) if calendar.dates_missing_content else []
             
             if missing_dates:
                 return {
@@ -267,78 +274,110 @@ class CompleteTaskView(BaseTaskView):
                     "message": f"Content missing for dates: {missing_dates}"
                 }
             
-            mark_task_as_completed(task, current_user=request.user)
             return {"success": True, "message": "Content verified."}
             
         except ClientCalendar.DoesNotExist:
             return {"success": False, "message": "No calendar found for the current month."}
 
-    def _check_creatives_design_task(self, task, request, calendar_id):
+    def _check_creatives_design_task(self, task, calendar_id):
         # Check if all creatives are uploaded for the calendar
         try:
-            calendar = ClientCalendar.objects.get(client=task.client, id=calendar_id)
-            dates = ClientCalendarDate.objects.filter(calendar=calendar)
-            
-            missing_dates = [date.date for date in dates if not date.creatives]
+            calendar = self._get_calendar(task, calendar_id)
+            missing_dates = completeness.missing_creatives_dates(calendar) if calendar.dates_missing_creatives else []
             if missing_dates:
                 return {
                     "success": False,
                     "message": f"Creatives missing for dates: {missing_dates}"
                 }
             
+            writes = []
             if not calendar.creatives_completed:
                 calendar.creatives_completed = True
-                calendar.save()
+                writes.append((calendar, ['creatives_completed']))
             
-            mark_task_as_completed(task, current_user=request.user)
-            return {"success": True, "message": "Creatives verified."}
+            return {"success": True, "message": "Creatives verified.", "writes": writes}
             
         except ClientCalendar.DoesNotExist:
             return {"success": False, "message": "No calendar found with the provided ID."}
 
-    def _check_invoice_submission(self, task, request, invoice_id):
+    def _check_invoice_submission(self, task, invoice_id):
         # Check if invoice has been submitted for the latest month
         try:
-            invoice = ClientInvoices.objects.get(id=invoice_id, client=task.client)
+            invoice = ClientInvoices.objects.get(id=invoice_id, client_id=task.client_id)
             if not invoice.invoice:
                 return {"success": False, "message": "No invoice uploaded for the latest month."}
             
-            mark_task_as_completed(task, current_user=request.user)
             return {"success": True, "message": "Invoice submission verified."}
             
         except ClientInvoices.DoesNotExist:
             return {"success": False, "message": "No invoice found for the client."}
 
-    def _check_invoice_status(self, task, request, invoice_id, required_status):
+    def _check_invoice_status(self, task, invoice_id, required_status):
         # Check invoice status against required status
         try:
-            invoice = ClientInvoices.objects.get(id=invoice_id, client=task.client)
+            invoice = ClientInvoices.objects.get(id=invoice_id, client_id=task.client_id)
             if invoice.submission_status != required_status:
                 return {
                     "success": False,
                     "message": f"Invoice status is '{invoice.submission_status}', not '{required_status}'."
                 }
             
-            mark_task_as_completed(task, current_user=request.user)
             return {"success": True, "message": f"Invoice status verified as '{required_status}'."}
             
         except ClientInvoices.DoesNotExist:
             return {"success": False, "message": "No invoice found for the client."}
 
-    def _update_calendar_flag(self, task, request, calendar_id, flag_name):
-        # Update a specific flag in the client calendar
+    def _update_calendar_flag(self, task, calendar_id, flag_name):
+        # Stage a flag update on the client calendar
         try:
-            calendar = ClientCalendar.objects.get(client=task.client, id=calendar_id)
+            calendar = self._get_calendar(task, calendar_id)
             setattr(calendar, flag_name, True)
-            calendar.save()
-            
-            mark_task_as_completed(task, current_user=request.user)
-            return {"success": True, "message": f"{flag_name.replace('_', ' ').title()} flag updated."}
+            return {
+                "success": True,
+                "message": f"{flag_name.replace('_', ' ').title()} flag updated.",
+                "writes": [(calendar, [flag_name])],
+            }
             
         except ClientCalendar.DoesNotExist:
             return {"success": False, "message": "No calendar found with the provided ID."}
 
 
+class TaskCycleTimeView(APIView):
+    # Daily time-in-step statistics for reporting; reads the rollups only, never the transition log
+    permission_classes = [IsAuthenticated, IsMarketingDirector]
+    DEFAULT_DAYS = 30
+
+    def get(self, request):
+        scope = request.query_params.get('scope', 'step')
+        if scope not in dict(TaskCycleRollup.SCOPE_CHOICES):
+            return Response({"error": f"Invalid scope '{scope}'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            end = date.fromisoformat(request.query_params['to']) if 'to' in request.query_params else timezone.localdate()
+            start = (
+                date.fromisoformat(request.query_params['from']) if 'from' in request.query_params
+                else end - timedelta(days=self.DEFAULT_DAYS - 1)
+            )
+        except ValueError:
+            return Response({"error": "'from' and 'to' must be dates like 2025-07-31."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            team_id, user_id = (
+                int(request.query_params[name]) if request.query_params.get(name) else None
+                for name in ('team', 'user')
+            )
+        except ValueError:
+            return Response({"error": "'team' and 'user' must be ids."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = analytics.cycle_time_rows(
+            scope, start, end,
+            task_type=request.query_params.get('task_type'),
+            team_id=team_id,
+            user_id=user_id,
+        )
+        return Response({"scope": scope, "from": start, "to": end, "results": rows}, status=status.HTTP_200_OK)
+
+
 class TaskListView(generics.ListAPIView):
     # List tasks for a specific client
     permission_classes = [IsAuthenticated]
@@ -394,28 +433,8 @@ class UpdateCustomTaskStatusView(APIView):
                 # Save old file path for cleanup
                 old_file_path = task.custom_task_file
                 
-                # Process new file upload
-                path_in_bucket = f"task_files/{new_file.name}"
-                with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                    for chunk in new_file.chunks():
-                        tmp.write(chunk)
-                    tmp_path = tmp.name
-                
-                try:
-                    storage.upload(
-                        file=tmp_path,
-                        path=path_in_bucket,
-                        file_options={"content-type": new_file.content_type}
-                    )
-                except StorageApiError as exc:
-                    if isinstance(exc.args[0], dict) and exc.args[0].get("statusCode") == 409:
-                        storage.update(
-                            file=tmp_path,
-                            path=path_in_bucket,
-                            file_options={"content-type": new_file.content_type}
-                        )
-                    else:
-                        raise
+                # Stream the new file to storage (overwrites an existing key)
+                path_in_bucket = storage.upload_file(new_file, f"task_files/{new_file.name}")
                 
                 # Update task with new file path
                 task.custom_task_file = path_in_bucket
@@ -429,9 +448,6 @@ class UpdateCustomTaskStatusView(APIView):
                 
             except Exception as e:
                 return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            finally:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
 
         # Update task status if provided
         new_status = request.data.get("task_status")
@@ -0,0 +1,76 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import CustomTask, Task, UserTaskLoad
+
+LOAD_FIELDS = ('open_tasks', 'open_custom_tasks')
+
+
+def adjust(user_id, open_tasks=0, open_custom_tasks=0):
+    """Add the deltas to the user's open task counters, creating the row on first use."""
+    deltas = {'open_tasks': open_tasks, 'open_custom_tasks': open_custom_tasks}
+    changes = {
+        field: Greatest(F(field) + delta, 0) if delta < 0 else F(field) + delta
+        for field, delta in deltas.items() if delta
+    }
+    if not user_id or not changes:
+        return
+    if UserTaskLoad.objects.filter(user_id=user_id).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            UserTaskLoad.objects.create(user_id=user_id, **{field: max(delta, 0) for field, delta in deltas.items()})
+    except IntegrityError:
+        # Created concurrently
+        UserTaskLoad.objects.filter(user_id=user_id).update(**changes)
+
+
+def record_task_assigned(previous, user_id):
+    """
+    Count a workflow task (re)opened for user_id. previous is the task's
+    (is_completed, assigned_to_id) before the write, or None for a new task.
+    """
+    if previous and not previous[0]:
+        if previous[1] == user_id:
+            return
+        adjust(previous[1], open_tasks=-1)
+    adjust(user_id, open_tasks=1)
+
+
+def loads(user_ids):
+    """{user_id: open tasks + open custom tasks}; users without a row have no open work."""
+    rows = UserTaskLoad.objects.filter(user_id__in=user_ids).values_list('user_id', *LOAD_FIELDS)
+    current = {user_id: 0 for user_id in user_ids}
+    current.update({user_id: tasks + custom for user_id, tasks, custom in rows})
+    return current
+
+
+def compute():
+    """Actual {user_id: {field: count}} from the task tables."""
+    actual = {}
+    open_tasks = Task.objects.filter(is_completed=False).values_list('assigned_to_id').annotate(n=Count('id'))
+    open_custom = CustomTask.objects.filter(task_status=False).values_list('assign_to_id_id').annotate(n=Count('id'))
+    for field, rows in (('open_tasks', open_tasks), ('open_custom_tasks', open_custom)):
+        for user_id, count in rows:
+            actual.setdefault(user_id, dict.fromkeys(LOAD_FIELDS, 0))[field] = count
+    return actual
+
+
+def recompute(fix=True):
+    """Compare the stored counters with the task tables; returns {user_id: {field: (stored, actual)}}."""
+    actual = compute()
+    stored = {row['user_id']: row for row in UserTaskLoad.objects.values('user_id', *LOAD_FIELDS)}
+    drift = {}
+    for user_id in set(actual) | set(stored):
+        counts = actual.get(user_id, dict.fromkeys(LOAD_FIELDS, 0))
+        row = stored.get(user_id, dict.fromkeys(LOAD_FIELDS, 0))
+        fields = {field: (row[field], counts[field]) for field in LOAD_FIELDS if row[field] != counts[field]}
+        if fields:
+            drift[user_id] = fields
+    if fix and drift:
+        with transaction.atomic():
+            for user_id in drift:
+                counts = actual.get(user_id, dict.fromkeys(LOAD_FIELDS, 0))
+                UserTaskLoad.objects.update_or_create(user_id=user_id, defaults=counts)
+    return drift
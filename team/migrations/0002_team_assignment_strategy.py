@@ -0,0 +1,18 @@
+# Generated by Django 4.2.18 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('team', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='assignment_strategy',
+            field=models.CharField(choices=[('least_loaded', 'Least Loaded'), ('round_robin', 'Round Robin'), ('sticky', 'Sticky per Client')], default='least_loaded', max_length=20),
+        ),
+    ]
@@ -4,8 +4,16 @@ from django.conf import settings
 # Create your models here.
 # TEAM 
 class Team(models.Model):
+    # How pro_app.assignment picks among members sharing a role (see STRATEGIES there)
+    ASSIGNMENT_STRATEGY_CHOICES = [
+        ('least_loaded', 'Least Loaded'),
+        ('round_robin', 'Round Robin'),
+        ('sticky', 'Sticky per Client'),
+    ]
+
     name = models.CharField(max_length=100)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='created_teams')
+    assignment_strategy = models.CharField(max_length=20, choices=ASSIGNMENT_STRATEGY_CHOICES, default='least_loaded')
 
     def __str__(self):
         return self.name
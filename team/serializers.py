@@ -11,14 +11,18 @@ class TeamSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Team
-        fields = ['id', 'name', 'created_by', 'members_count', 'clients_count']
+        fields = ['id', 'name', 'created_by', 'assignment_strategy', 'members_count', 'clients_count']
 
-    # Serializer method to get the number of members in the team
+    # Serializer method to get the number of members in the team (annotated by team.summary when available)
     def get_members_count(self, obj):
+        if hasattr(obj, 'members_count'):
+            return obj.members_count
         return obj.memberships.count()
 
     # Serializer method to get the number of clients associated with the team
     def get_clients_count(self, obj):
+        if hasattr(obj, 'clients_count'):
+            return obj.clients_count
         return Clients.objects.filter(team=obj).count()
 
 
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Team, TeamMembership
+
+# Cached list pages are keyed by a version number; pro_app.signals bumps it
+# whenever teams, memberships, member roles or client assignments change.
+SUMMARY_CACHE_TIMEOUT = 60 * 5
+_VERSION_KEY = "team_summary_version"
+
+
+def annotated_teams():
+    """Teams with members_count/clients_count computed in the same query."""
+    return Team.objects.annotate(
+        members_count=Count('memberships', distinct=True),
+        clients_count=Count('clients', distinct=True),
+    ).order_by('id')
+
+
+def team_roles(team_ids):
+    """Return {team_id: {role, ...}} for the given teams with one grouped query."""
+    roles = {team_id: set() for team_id in team_ids}
+    rows = TeamMembership.objects.filter(team_id__in=team_ids).values_list('team_id', 'user__role').distinct()
+    for team_id, role in rows:
+        roles[team_id].add(role)
+    return roles
+
+
+def team_status(required_roles, roles):
+    missing_roles = sorted(required_roles - roles)
+    return "complete" if not missing_roles else f"incomplete, missing roles: {', '.join(missing_roles)}"
+
+
+def build_team_summaries(teams, required_roles):
+    """Summary rows for annotated teams: two queries however many teams there are."""
+    teams = list(teams)
+    roles = team_roles([team.id for team in teams])
+    return [
+        {
+            'team_id': team.id,
+            'name': team.name,
+            'members_count': team.members_count,
+            'clients_count': team.clients_count,
+            'status': team_status(required_roles, roles[team.id]),
+        }
+        for team in teams
+    ]
+
+
+def get_summary_version():
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(_VERSION_KEY, version, None)
+    return version
+
+
+def bump_summary_version():
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.add(_VERSION_KEY, 1, None)
+
+
+def summary_cache_key(*parts):
+    return ":".join(["team_summary", str(get_summary_version()), *map(str, parts)])
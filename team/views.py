@@ -1,18 +1,72 @@
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
+from django.core.cache import cache
+from django.db import transaction
 
 # Assuming you have custom permissions and models
 from pro_app.permissions import IsMarketingDirector 
 from .models import Team,TeamMembership
 from account.models import CustomUser
 from . import serializers  
+from . import summary
+from pro_app import roster
+from notifications.dispatch import refresh_user_groups
+
+
+class TeamSummaryPagination(PageNumberPagination):
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 # Create your views here.
+def resolve_team_members(members_data, allowed_roles):
+    """
+    Load every requested member with one query and validate roles in memory.
+    Returns (users, error_response); users keep the request order.
+    """
+    user_ids, invalid = [], []
+    for member_data in members_data:
+        raw_id = member_data.get('user_id')
+        # Request ids may arrive as strings; anything that isn't a whole number can't match a user
+        try:
+            user_id = int(raw_id)
+        except (TypeError, ValueError):
+            invalid.append(raw_id)
+            continue
+        if user_id not in user_ids:
+            user_ids.append(user_id)
+
+    users = CustomUser.objects.in_bulk(user_ids)
+    missing = invalid + [user_id for user_id in user_ids if user_id not in users]
+    if missing:
+        return None, Response({"error": f"Users not found: {', '.join(map(str, missing))}."}, status=status.HTTP_400_BAD_REQUEST)
+
+    ordered = [users[user_id] for user_id in user_ids]
+    for user in ordered:
+        # Check if the user's role is in the allowed roles
+        if user.role not in allowed_roles:
+            return None, Response(
+                {"error": f"Invalid role: {user.role}. Only {', '.join(allowed_roles)} roles are allowed in the team."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    return ordered, None
+
+
+def after_bulk_membership_change(team_id, user_ids):
+    # bulk_create skips post_save, so refresh the cached roster, team summary
+    # and the members' notification socket groups here
+    roster.invalidate_team_roster(team_id)
+    summary.bump_summary_version()
+    refresh_user_groups(user_ids)
+
+
 class TeamListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsMarketingDirector]
     queryset = Team.objects.all()
     serializer_class = serializers.TeamSerializer
+    pagination_class = TeamSummaryPagination
 
     # Allowed roles in a team
     REQUIRED_ROLES = {'marketing_manager', 'marketing_assistant', 'content_writer', 'graphics_designer'}
@@ -24,34 +78,31 @@ class TeamListCreateView(generics.ListCreateAPIView):
         # Add the current account manager as the creator of the team
         team_data['created_by'] = request.user.id  # Assuming 'created_by' is in the Team model
 
+        # Resolve and validate all members before writing anything
+        members, error_response = resolve_team_members(request.data.get('members', []), self.REQUIRED_ROLES)
+        if error_response:
+            return error_response
+
         # Create the team
         team_serializer = self.get_serializer(data=team_data)
         if team_serializer.is_valid():
-            team = team_serializer.save()
-
-            # Add members to the team
-            members_data = request.data.get('members', [])
-            roles_added = set()
-            members_added = []
-
-            for member_data in members_data:
-                user_id = member_data.get('user_id')
-                user = CustomUser.objects.get(id=user_id)
-
-                # Check if the user's role is in the allowed roles
-                if user.role not in self.REQUIRED_ROLES:
-                    return Response(
-                        {"error": f"Invalid role: {user.role}. Only {', '.join(self.REQUIRED_ROLES)} roles are allowed in the team."},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                membership = TeamMembership.objects.create(team=team, user=user)
-                roles_added.add(user.role)
-                members_added.append({
+            with transaction.atomic():
+                team = team_serializer.save()
+                TeamMembership.objects.bulk_create(
+                    [TeamMembership(team=team, user=user) for user in members],
+                    ignore_conflicts=True,
+                )
+                transaction.on_commit(lambda: after_bulk_membership_change(team.id, [user.id for user in members]))
+
+            roles_added = {user.role for user in members}
+            members_added = [
+                {
                     'user_id': user.id,
                     'username': user.username,
                     'role': user.get_role_display()
-                })
+                }
+                for user in members
+            ]
 
             # Check if the team is complete based on the required roles
             missing_roles = self.REQUIRED_ROLES - roles_added
@@ -68,31 +119,20 @@ class TeamListCreateView(generics.ListCreateAPIView):
 
 
     def list(self, request, *args, **kwargs):
-        teams = self.get_queryset()
-        team_data = []
-
-        for team in teams:
-            members_count = team.memberships.count()
-            clients_count = team.clients.count()
-            
-            # Check if the team is complete
-            team_roles = set(team.memberships.values_list('user__role', flat=True))
-            missing_roles = self.REQUIRED_ROLES - team_roles
-            team_status = "complete" if not missing_roles else f"incomplete, missing roles: {', '.join(missing_roles)}"
+        # Counts come from one annotated query, roles from one grouped query; pages are cached
+        key = summary.summary_cache_key(request.query_params.get('page', 1), request.query_params.get('page_size', ''))
+        response_data = cache.get(key)
+        if response_data is None:
+            page = self.paginate_queryset(summary.annotated_teams())
+            team_data = summary.build_team_summaries(page, self.REQUIRED_ROLES)
+            response_data = self.get_paginated_response(team_data).data
+            cache.set(key, response_data, summary.SUMMARY_CACHE_TIMEOUT)
 
-            team_data.append({
-                'team_id': team.id,
-                'name': team.name,
-                'members_count': members_count,
-                'clients_count': clients_count,
-                'status': team_status
-            })
-
-        return Response(team_data, status=status.HTTP_200_OK)
+        return Response(response_data, status=status.HTTP_200_OK)
 
 class TeamRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated, IsMarketingDirector]
-    queryset = Team.objects.all()
+    queryset = summary.annotated_teams()
     serializer_class = serializers.TeamSerializer
 
     # Allowed roles in a team
@@ -121,52 +161,57 @@ class TeamRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
         partial = kwargs.pop('partial', True)
         instance = self.get_object()
 
+        # Resolve and validate all members before writing anything
+        members_data = request.data.get('members', [])
+        members, error_response = resolve_team_members(members_data, self.REQUIRED_ROLES)
+        if error_response:
+            return error_response
+
         # Update the team details using request.data
         team_serializer = self.get_serializer(instance, data=request.data['team'], partial=partial)
         if team_serializer.is_valid():
-            team = team_serializer.save()
+            with transaction.atomic():
+                team = team_serializer.save()
+
+                # The members list replaces the team's membership: add new members, drop the rest
+                if members_data:
+                    member_ids = [user.id for user in members]
+                    TeamMembership.objects.bulk_create(
+                        [TeamMembership(team=team, user=user) for user in members],
+                        ignore_conflicts=True,
+                    )
+                    TeamMembership.objects.filter(team=team).exclude(user_id__in=member_ids).delete()
+                    transaction.on_commit(lambda: after_bulk_membership_change(team.id, member_ids))
+
+            # The annotated counts on the instance predate the membership rewrite
+            updated_team = self.get_serializer(summary.annotated_teams().get(pk=team.pk)).data
 
             # Update members if 'members' key is present in the request data
-            members_data = request.data.get('members', [])
             if members_data:
-                roles_added = set()
-                members_added = []
-
-                for member_data in members_data:
-                    user_id = member_data.get('user_id')
-                    user = CustomUser.objects.get(id=user_id)
-                    
-                    # Check if the user's role is in the allowed roles
-                    if user.role not in self.REQUIRED_ROLES:
-                        return Response(
-                            {"error": f"Invalid role: {user.role}. Only {', '.join(self.REQUIRED_ROLES)} roles are allowed in the team."},
-                            status=status.HTTP_400_BAD_REQUEST
-                        )
-                    
-                    # Create or update the membership
-                    membership, created = TeamMembership.objects.update_or_create(
-                        team=team, user=user, defaults={}
-                    )
-                    roles_added.add(user.role)
-                    members_added.append({
-                        'membership_id': membership.id,
+                membership_ids = dict(TeamMembership.objects.filter(team=team).values_list('user_id', 'id'))
+                roles_added = {user.role for user in members}
+                members_added = [
+                    {
+                        'membership_id': membership_ids[user.id],
                         'user_id': user.id,
                         'username': user.username,
                         'role': user.get_role_display()
-                    })
+                    }
+                    for user in members
+                ]
 
                 # Check if the team is complete based on the required roles
                 missing_roles = self.REQUIRED_ROLES - roles_added
                 team_status = "complete" if not missing_roles else f"incomplete, missing roles: {', '.join(missing_roles)}"
 
                 response_data = {
-                    'team': team_serializer.data,
+                    'team': updated_team,
                     'members': members_added,
                     'status': team_status
                 }
             else:
                 response_data = {
-                    'team': team_serializer.data,
+                    'team': updated_team,
                     'members': "No members were provided for update."
                 }
 
@@ -2,7 +2,9 @@ from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from django.core.exceptions import PermissionDenied
 
-from pro_app.utils import send_task_notification
+from notifications.dispatch import client_group_name
+from pro_app import roster
+from pro_app.utils import send_bulk_notifications
 from .serializers import ClientMessageThreadSerializer, ClientMessageThread
 from django.shortcuts import get_object_or_404
 from client.models import Clients
@@ -19,7 +21,7 @@ class ThreadMessageListCreateView(generics.ListCreateAPIView):
     def _check_permissions(self, client):
 
         """Helper method to check if the user can access the thread."""
-        is_team_member = client.team.memberships.filter(user=self.request.user).exists()
+        is_team_member = roster.is_team_member(client.team_id, self.request.user.id)
         is_account_manager = client.account_manager == self.request.user
         is_marketing_director = self.request.user.role.replace(' ', '_').lower() == 'marketing_director'  # ✅ Direct role check
         if not (is_team_member or is_account_manager or is_marketing_director):
@@ -46,18 +48,18 @@ class ThreadMessageListCreateView(generics.ListCreateAPIView):
         message = serializer.save(client=client, sender=self.request.user)
         
         # Notify relevant users (team members + account manager, excluding sender)
-        team_members = client.team.memberships.exclude(user=self.request.user).values_list('user', flat=True)
+        team_members = [user_id for user_id in roster.get_team_member_ids(client.team_id) if user_id != self.request.user.id]
         account_manager = client.account_manager
-        recipients = set(list(team_members) + ([account_manager.id] if account_manager and account_manager != self.request.user else []))
+        recipients = set(team_members + ([account_manager.id] if account_manager and account_manager != self.request.user else []))
         
-        for recipient_id in recipients:
-            recipient = get_object_or_404(CustomUser, id=recipient_id)
-            send_task_notification(
-                recipient=recipient,
-                sender=self.request.user,
-                message=f"New message in the thread for client '{client.business_name}'.",
-                notification_type="thread_notify"
-            )
+        # One query for the recipients, one bulk insert and one client group push for all of them
+        send_bulk_notifications(
+            CustomUser.objects.in_bulk(recipients).values(),
+            message=f"New message in the thread for client '{client.business_name}'.",
+            notification_type="thread_notify",
+            sender=self.request.user,
+            group_name=client_group_name(client.id),
+        )
 
 
 class ListCreateNoteView(generics.ListCreateAPIView):
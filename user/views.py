@@ -1,6 +1,5 @@
 # Python standard library
 import os
-import tempfile
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -133,48 +132,28 @@ class UpdateProfileView(generics.UpdateAPIView):
 
         if profile_file:
             # Handle file upload to Supabase
-            tmp_path = None
-            try:
-                # Save upload to temp file
-                with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                    for chunk in profile_file.chunks():
-                        tmp.write(chunk)
-                    tmp_path = tmp.name
-
-                # Generate unique filename
-                ext = profile_file.name.split('.')[-1]
-                new_filename = f"profile_{user.id}_{now().strftime('%Y%m%d%H%M%S')}.{ext}"
-                path_in_bucket = f"profiles/{new_filename}"
-
-                # Remove old file if exists
-                old_key = user.profile.name if user.profile else None
-                if old_key:
-                    try:
-                        storage.remove([old_key])
-                    except Exception:
-                        pass
-
-                # Upload new file
+            # Generate unique filename
+            ext = profile_file.name.split('.')[-1]
+            new_filename = f"profile_{user.id}_{now().strftime('%Y%m%d%H%M%S')}.{ext}"
+            path_in_bucket = f"profiles/{new_filename}"
+
+            # Remove old file if exists
+            old_key = user.profile.name if user.profile else None
+            if old_key:
                 try:
-                    storage.upload(
-                        file=tmp_path,
-                        path=path_in_bucket,
-                        file_options={"content-type": profile_file.content_type}
-                    )
-                except StorageApiError as exc:
-                    msg = str(exc)
-                    if exc.args and isinstance(exc.args[0], dict):
-                        msg = exc.args[0].get("message", msg)
-                    raise serializers.ValidationError({"profile": [msg]})
-
-                # Update user profile path
-                user.profile = path_in_bucket
-                user.save()
-
-            finally:
-                # Clean up temp file
-                if tmp_path and os.path.exists(tmp_path):
-                    os.unlink(tmp_path)
+                    storage.remove([old_key])
+                except Exception:
+                    pass
+
+            # Upload new file
+            try:
+                storage.upload_file(profile_file, path_in_bucket)
+            except StorageApiError as exc:
+                raise serializers.ValidationError({"profile": [storage.storage_error_message(exc)]})
+
+            # Update user profile path
+            user.profile = path_in_bucket
+            user.save()
 
         # Update other fields
         serializer.save()